@@ -5,289 +5,585 @@ Args: event - dict с httpMethod, body, queryStringParameters
 Returns: HTTP response dict с данными контента
 '''
 
+import base64
+import hashlib
 import json
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Dict, Any
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
 
-def get_db_connection():
-    database_url = os.environ.get('DATABASE_URL')
-    return psycopg2.connect(database_url, cursor_factory=RealDictCursor)
+from db import execute_prepared, get_connection
+from instrument import dumps, instrumented
 
-def escape_sql_string(value):
-    """Экранирование строк для Simple Query Protocol"""
-    if value is None:
-        return 'NULL'
-    return "'" + str(value).replace("'", "''") + "'"
+# Сериализованные ответы GET живут в памяти тёплого экземпляра; 0 отключает кэш
+CACHE_TTL = float(os.environ.get('CONTENT_CACHE_TTL', '60'))
+# Браузеры и CDN держат ответ MAX_AGE секунд, затем ещё STALE_WHILE_REVALIDATE отдают его, перепроверяя в фоне
+MAX_AGE = int(os.environ.get('CONTENT_MAX_AGE', '30'))
+STALE_WHILE_REVALIDATE = int(os.environ.get('CONTENT_STALE_WHILE_REVALIDATE', '300'))
+# Страницы галереи кэшируются по курсору, поэтому число записей ограничено
+MAX_CACHE_ENTRIES = 256
+GALLERY_PAGE_SIZE = 24
+GALLERY_MAX_PAGE_SIZE = 100
+_response_cache: Dict[str, Tuple[float, str, str]] = {}
 
+PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token',
+    'Access-Control-Max-Age': '86400'
+}
+JSON_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+def make_etag(body: str) -> str:
+    return '"' + hashlib.sha1(body.encode('utf-8')).hexdigest() + '"'
+
+def get_cached_body(key: str) -> Optional[Tuple[str, str]]:
+    entry = _response_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, body, etag = entry
+    if time.monotonic() >= expires_at:
+        _response_cache.pop(key, None)
+        return None
+    return body, etag
+
+def set_cached_body(key: str, body: str, etag: str) -> None:
+    if CACHE_TTL > 0:
+        if len(_response_cache) >= MAX_CACHE_ENTRIES:
+            now = time.monotonic()
+            for stale_key in [k for k, entry in _response_cache.items() if entry[0] <= now]:
+                del _response_cache[stale_key]
+            if len(_response_cache) >= MAX_CACHE_ENTRIES:
+                _response_cache.clear()
+        _response_cache[key] = (time.monotonic() + CACHE_TTL, body, etag)
+
+def invalidate_cache() -> None:
+    _response_cache.clear()
+
+def get_request_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    request_headers = event.get('headers') or {}
+    lowered = name.lower()
+    for key, value in request_headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Слабые валидаторы W/"..." сравниваются по значению
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+def cacheable_response(event: Dict[str, Any], headers: Dict[str, str], body: str, etag: str) -> Dict[str, Any]:
+    response_headers = {
+        **headers,
+        'ETag': etag,
+        'Cache-Control': f'public, max-age={MAX_AGE}, stale-while-revalidate={STALE_WHILE_REVALIDATE}',
+        'Access-Control-Expose-Headers': 'ETag'
+    }
+    
+    if etag_matches(get_request_header(event, 'If-None-Match'), etag):
+        return {
+            'statusCode': 304,
+            'headers': response_headers,
+            'isBase64Encoded': False,
+            'body': ''
+        }
+    
+    return {
+        'statusCode': 200,
+        'headers': response_headers,
+        'isBase64Encoded': False,
+        'body': body
+    }
+
+def encode_cursor(created_at: str, photo_id: int) -> str:
+    raw = f'{created_at}|{photo_id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    created_at, photo_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(created_at), int(photo_id)
+
+def gallery_cache_key(params: Dict[str, str]) -> str:
+    if params.get('id'):
+        return f"gallery:photo:{params['id']}"
+    return f"gallery:{params.get('limit', '')}:{params.get('cursor', '')}"
+
+def load_gallery_page(cur, params: Dict[str, str]) -> Dict[str, Any]:
+    """Страница галереи для первой отрисовки: только превью, без описаний и списка вариантов. ValueError при неверных limit/cursor"""
+    limit = max(1, min(int(params.get('limit') or GALLERY_PAGE_SIZE), GALLERY_MAX_PAGE_SIZE))
+    # Превью - самый узкий JPEG-вариант; у фото без вариантов - исходная ссылка
+    select_sql = """
+        SELECT p.id, p.title, p.width, p.height, p.created_at,
+            COALESCE((
+                SELECT v.url FROM gallery_photo_variants v
+                WHERE v.photo_id = p.id AND v.format = 'jpeg'
+                ORDER BY v.width
+                LIMIT 1
+            ), p.url) AS thumb,
+            (SELECT total_count FROM gallery_counters WHERE id = 1) AS total
+        FROM gallery_photos p
+    """
+    if params.get('cursor'):
+        cursor_created_at, cursor_id = decode_cursor(params['cursor'])
+        execute_prepared(
+            cur,
+            'content_gallery_page_after',
+            select_sql + 'WHERE (p.created_at, p.id) < (%s, %s) ORDER BY p.created_at DESC, p.id DESC LIMIT %s',
+            (cursor_created_at, cursor_id, limit + 1)
+        )
+    else:
+        execute_prepared(
+            cur,
+            'content_gallery_page',
+            select_sql + 'ORDER BY p.created_at DESC, p.id DESC LIMIT %s',
+            (limit + 1,)
+        )
+    rows = cur.fetchall()
+    
+    photos = [
+        {
+            'id': str(row['id']),
+            'title': row['title'],
+            'thumb': row['thumb'],
+            'width': row['width'],
+            'height': row['height']
+        }
+        for row in rows[:limit]
+    ]
+    
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last['created_at'].isoformat(), last['id'])
+    
+    # Общее число фото ведёт триггер в gallery_counters - без COUNT(*) по всей таблице на каждой странице
+    total = rows[0]['total'] if rows else None
+    if total is None:
+        cur.execute('SELECT total_count AS total FROM gallery_counters WHERE id = 1')
+        counters = cur.fetchone()
+        total = counters['total'] if counters else 0
+    
+    return {'photos': photos, 'total': total, 'next_cursor': next_cursor}
+
+def load_gallery_photo(cur, photo_id: int) -> Optional[Dict[str, Any]]:
+    execute_prepared(cur, 'content_gallery_photo', """
+        SELECT p.id, p.url, p.title, p.description, p.width, p.height, p.placeholder,
+            COALESCE((
+                SELECT json_agg(json_build_object('format', v.format, 'width', v.width, 'url', v.url) ORDER BY v.format, v.width)
+                FROM gallery_photo_variants v
+                WHERE v.photo_id = p.id
+            ), '[]'::json) AS sources
+        FROM gallery_photos p
+        WHERE p.id = %s
+    """, (photo_id,))
+    photo = cur.fetchone()
+    if photo is None:
+        return None
+    return {
+        'id': str(photo['id']),
+        'url': photo['url'],
+        'title': photo['title'],
+        'description': photo['description'],
+        'width': photo['width'],
+        'height': photo['height'],
+        'placeholder': photo['placeholder'],
+        'sources': photo['sources']
+    }
+
+def load_content(cur) -> Dict[str, Any]:
+    """Загрузка публичного контента фиксированным числом запросов (без N+1 по видам спорта)"""
+    execute_prepared(cur, 'content_contacts', 'SELECT address, phone, email, hours FROM contacts ORDER BY id DESC LIMIT 1')
+    contacts = cur.fetchone()
+    
+    execute_prepared(cur, 'content_sports', 'SELECT id, name, image, video FROM sports ORDER BY display_order')
+    sports_rows = cur.fetchall()
+    sport_ids = [sport['id'] for sport in sports_rows]
+    
+    rules_by_sport: Dict[str, List[str]] = {sport_id: [] for sport_id in sport_ids}
+    safety_by_sport: Dict[str, List[str]] = {sport_id: [] for sport_id in sport_ids}
+    
+    if sport_ids:
+        execute_prepared(
+            cur,
+            'content_sport_rules',
+            'SELECT sport_id, rule_text FROM sport_rules WHERE sport_id = ANY(%s) ORDER BY sport_id, display_order, id',
+            (sport_ids,)
+        )
+        for row in cur.fetchall():
+            rules_by_sport[row['sport_id']].append(row['rule_text'])
+        
+        execute_prepared(
+            cur,
+            'content_sport_safety',
+            'SELECT sport_id, safety_text FROM sport_safety WHERE sport_id = ANY(%s) ORDER BY sport_id, display_order, id',
+            (sport_ids,)
+        )
+        for row in cur.fetchall():
+            safety_by_sport[row['sport_id']].append(row['safety_text'])
+    
+    sports = []
+    for sport in sports_rows:
+        sports.append({
+            'id': sport['id'],
+            'name': sport['name'],
+            'image': sport['image'],
+            'video': sport['video'],
+            'rules': rules_by_sport[sport['id']],
+            'safety': safety_by_sport[sport['id']]
+        })
+    
+    execute_prepared(cur, 'content_partners', 'SELECT name, url FROM partners ORDER BY display_order')
+    partners = [{'name': p['name'], 'url': p['url']} for p in cur.fetchall()]
+    
+    return {
+        'contacts': dict(contacts) if contacts else None,
+        'sports': sports,
+        'partners': partners
+    }
+
+def snapshot_etag(version: int) -> str:
+    return f'"content-{version}"'
+
+def refresh_snapshot(cur) -> None:
+    """Пересборка снимка в транзакции записи: триггеры уже подняли version, тело собирается из ещё не закоммиченных данных"""
+    body = dumps(load_content(cur))
+    cur.execute("UPDATE content_snapshot SET body = %s, updated_at = CURRENT_TIMESTAMP WHERE id = 1", (body,))
+
+def load_snapshot(conn, cur) -> Tuple[str, str]:
+    """Публичный контент одной строкой: готовый JSON отдаётся как есть. Сброшенный триггером снимок пересобирается и сохраняется"""
+    execute_prepared(cur, 'content_snapshot', 'SELECT version, body FROM content_snapshot WHERE id = 1')
+    row = cur.fetchone()
+    if row is None:
+        body = dumps(load_content(cur))
+        # Строку удалили вручную: версия от текущего времени не совпадёт с ETag, выданными до удаления
+        cur.execute(
+            """
+            INSERT INTO content_snapshot (id, version, body)
+            VALUES (1, (EXTRACT(EPOCH FROM CURRENT_TIMESTAMP) * 1000)::BIGINT, %s)
+            ON CONFLICT (id) DO UPDATE SET body = EXCLUDED.body WHERE content_snapshot.body IS NULL
+            RETURNING version
+            """,
+            (body,)
+        )
+        inserted = cur.fetchone()
+        conn.commit()
+        if inserted is None:
+            return load_snapshot(conn, cur)
+        return body, snapshot_etag(inserted['version'])
+    if row['body'] is not None:
+        return row['body'], snapshot_etag(row['version'])
+
+    body = dumps(load_content(cur))
+    # Условие по version не даёт затереть снимок, если между чтением и записью контент успели изменить
+    cur.execute(
+        "UPDATE content_snapshot SET body = %s, updated_at = CURRENT_TIMESTAMP WHERE id = 1 AND version = %s AND body IS NULL",
+        (body, row['version'])
+    )
+    conn.commit()
+    return body, snapshot_etag(row['version'])
+
+def sync_sport_items(cur, table: str, text_column: str, sport_ids: List[str], items: List[Tuple[str, int, str]]) -> None:
+    """Синхронизация списка правил/техники безопасности одним запросом: обновление по позиции, вставка новых, удаление лишних"""
+    cur.execute(f"""
+        WITH incoming AS (
+            SELECT * FROM unnest(%s::varchar[], %s::int[], %s::text[]) AS i(sport_id, pos, item_text)
+        ), existing AS (
+            SELECT id, sport_id, ROW_NUMBER() OVER (PARTITION BY sport_id ORDER BY display_order, id) AS pos
+            FROM {table}
+            WHERE sport_id = ANY(%s)
+        ), updated AS (
+            UPDATE {table} t
+            SET {text_column} = i.item_text, display_order = i.pos
+            FROM existing e
+            JOIN incoming i ON i.sport_id = e.sport_id AND i.pos = e.pos
+            WHERE t.id = e.id
+        ), inserted AS (
+            INSERT INTO {table} (sport_id, {text_column}, display_order)
+            SELECT i.sport_id, i.item_text, i.pos
+            FROM incoming i
+            LEFT JOIN existing e ON e.sport_id = i.sport_id AND e.pos = i.pos
+            WHERE e.id IS NULL
+        )
+        DELETE FROM {table} t
+        USING existing e
+        LEFT JOIN incoming i ON i.sport_id = e.sport_id AND i.pos = e.pos
+        WHERE t.id = e.id AND i.sport_id IS NULL
+    """, (
+        [item[0] for item in items],
+        [item[1] for item in items],
+        [item[2] for item in items],
+        sport_ids
+    ))
+
+def save_sports(cur, sports_data: List[Dict[str, Any]]) -> None:
+    """Сохранение всего дерева видов спорта фиксированным числом запросов в одной транзакции"""
+    sport_ids = [str(sport.get('id')) for sport in sports_data]
+    
+    cur.execute("""
+        UPDATE sports s
+        SET name = i.name, image = i.image, video = i.video, updated_at = CURRENT_TIMESTAMP
+        FROM unnest(%s::varchar[], %s::varchar[], %s::text[], %s::text[]) AS i(id, name, image, video)
+        WHERE s.id = i.id
+    """, (
+        sport_ids,
+        [sport.get('name') for sport in sports_data],
+        [sport.get('image') for sport in sports_data],
+        [sport.get('video') for sport in sports_data]
+    ))
+    
+    rules = []
+    safety = []
+    for sport_id, sport in zip(sport_ids, sports_data):
+        rules.extend((sport_id, idx + 1, rule) for idx, rule in enumerate(sport.get('rules', [])))
+        safety.extend((sport_id, idx + 1, item) for idx, item in enumerate(sport.get('safety', [])))
+    
+    sync_sport_items(cur, 'sport_rules', 'rule_text', sport_ids, rules)
+    sync_sport_items(cur, 'sport_safety', 'safety_text', sport_ids, safety)
+
+def save_gallery_variants(cur, photo_id: int, variants: List[Dict[str, Any]]) -> None:
+    """Замена адаптивных вариантов фото (форматы и ширины, загруженные upload-photo)"""
+    cur.execute("DELETE FROM gallery_photo_variants WHERE photo_id = %s", (photo_id,))
+    cur.execute(
+        """
+        INSERT INTO gallery_photo_variants (photo_id, format, width, height, url)
+        SELECT %s, * FROM unnest(%s::varchar[], %s::int[], %s::int[], %s::text[])
+        """,
+        (
+            photo_id,
+            [variant.get('format') for variant in variants],
+            [variant.get('width') for variant in variants],
+            [variant.get('height') for variant in variants],
+            [variant.get('url') for variant in variants]
+        )
+    )
+
+@instrumented
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     
     if method == 'OPTIONS':
         return {
             'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token',
-                'Access-Control-Max-Age': '86400'
-            },
+            'headers': PREFLIGHT_HEADERS,
             'body': '',
             'isBase64Encoded': False
         }
     
-    headers = {
-        'Content-Type': 'application/json',
-        'Access-Control-Allow-Origin': '*'
-    }
+    headers = JSON_HEADERS
+    
+    if method == 'GET':
+        params = event.get('queryStringParameters') or {}
+        cache_key = gallery_cache_key(params) if params.get('type') == 'gallery' else 'all'
+        cached = get_cached_body(cache_key)
+        if cached is not None:
+            return cacheable_response(event, headers, *cached)
     
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        if method == 'GET':
-            params = event.get('queryStringParameters', {})
-            content_type = params.get('type', 'all') if params else 'all'
-            
-            if content_type == 'gallery':
-                cur.execute('SELECT id, url, title, description, created_at FROM gallery_photos ORDER BY created_at DESC')
-                photos = cur.fetchall()
-                
-                result = []
-                for photo in photos:
-                    result.append({
-                        'id': str(photo['id']),
-                        'url': photo['url'],
-                        'title': photo['title'],
-                        'description': photo['description']
-                    })
-                
-                cur.close()
-                conn.close()
-                
-                return {
-                    'statusCode': 200,
-                    'headers': headers,
-                    'isBase64Encoded': False,
-                    'body': json.dumps(result)
-                }
-            
-            cur.execute('SELECT address, phone, email, hours FROM contacts ORDER BY id DESC LIMIT 1')
-            contacts = cur.fetchone()
-            
-            cur.execute('SELECT id, name, image, video FROM sports ORDER BY display_order')
-            sports_rows = cur.fetchall()
+        # Драйвер загружается только на пути с запросом к базе; preflight и попадания в кэш обходятся без него
+        from psycopg2.extras import RealDictCursor
+
+        with get_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
             
-            sports = []
-            for sport in sports_rows:
-                sport_id = escape_sql_string(sport['id'])
-                cur.execute(f"SELECT rule_text FROM sport_rules WHERE sport_id = {sport_id} ORDER BY display_order")
-                rules = [row['rule_text'] for row in cur.fetchall()]
-                
-                cur.execute(f"SELECT safety_text FROM sport_safety WHERE sport_id = {sport_id} ORDER BY display_order")
-                safety = [row['safety_text'] for row in cur.fetchall()]
+            if method == 'GET':
+                params = event.get('queryStringParameters', {})
+                content_type = params.get('type', 'all') if params else 'all'
                 
-                sports.append({
-                    'id': sport['id'],
-                    'name': sport['name'],
-                    'image': sport['image'],
-                    'video': sport['video'],
-                    'rules': rules,
-                    'safety': safety
-                })
-            
-            cur.execute('SELECT name, url FROM partners ORDER BY display_order')
-            partners_rows = cur.fetchall()
-            partners = [{'name': p['name'], 'url': p['url']} for p in partners_rows]
-            
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 200,
-                'headers': headers,
-                'isBase64Encoded': False,
-                'body': json.dumps({
-                    'contacts': dict(contacts) if contacts else None,
-                    'sports': sports,
-                    'partners': partners
-                })
-            }
-        
-        if method == 'POST':
-            body_data = json.loads(event.get('body', '{}'))
-            post_type = body_data.get('type')
-            
-            if post_type == 'gallery':
-                data = body_data.get('data', {})
-                url = escape_sql_string(data.get('url'))
-                title = escape_sql_string(data.get('title'))
-                description = escape_sql_string(data.get('description', ''))
+                if content_type == 'gallery':
+                    try:
+                        if params.get('id'):
+                            result = load_gallery_photo(cur, int(params['id']))
+                        else:
+                            result = load_gallery_page(cur, params)
+                    except ValueError:
+                        cur.close()
+                        return {
+                            'statusCode': 400,
+                            'headers': headers,
+                            'isBase64Encoded': False,
+                            'body': json.dumps({'error': 'Invalid id, limit or cursor'})
+                        }
+                    cur.close()
+                    
+                    if result is None:
+                        return {
+                            'statusCode': 404,
+                            'headers': headers,
+                            'isBase64Encoded': False,
+                            'body': json.dumps({'error': 'Photo not found'})
+                        }
+                    
+                    body = dumps(result)
+                    etag = make_etag(body)
+                    set_cached_body(gallery_cache_key(params), body, etag)
+                    
+                    return cacheable_response(event, headers, body, etag)
                 
-                cur.execute(f"INSERT INTO gallery_photos (url, title, description) VALUES ({url}, {title}, {description}) RETURNING id")
-                photo_id = cur.fetchone()['id']
-                conn.commit()
+                body, etag = load_snapshot(conn, cur)
                 
                 cur.close()
-                conn.close()
                 
-                return {
-                    'statusCode': 201,
-                    'headers': headers,
-                    'isBase64Encoded': False,
-                    'body': json.dumps({
-                        'success': True,
-                        'id': str(photo_id),
-                        'url': data.get('url'),
-                        'title': data.get('title'),
-                        'description': data.get('description', '')
-                    })
-                }
-        
-        if method == 'PUT':
-            body_data = json.loads(event.get('body', '{}'))
-            update_type = body_data.get('type')
-            
-            if update_type == 'gallery':
-                data = body_data.get('data', {})
-                photo_id = int(data.get('id'))
-                url = escape_sql_string(data.get('url'))
-                title = escape_sql_string(data.get('title'))
-                description = escape_sql_string(data.get('description', ''))
+                set_cached_body('all', body, etag)
                 
-                cur.execute(f"UPDATE gallery_photos SET url = {url}, title = {title}, description = {description}, updated_at = CURRENT_TIMESTAMP WHERE id = {photo_id}")
-                conn.commit()
-                
-                cur.close()
-                conn.close()
-                
-                return {
-                    'statusCode': 200,
-                    'headers': headers,
-                    'isBase64Encoded': False,
-                    'body': json.dumps({'success': True, 'message': 'Фото обновлено'})
-                }
+                return cacheable_response(event, headers, body, etag)
             
-            if update_type == 'contacts':
-                data = body_data.get('data', {})
-                address = escape_sql_string(data.get('address'))
-                phone = escape_sql_string(data.get('phone'))
-                email = escape_sql_string(data.get('email'))
-                hours = escape_sql_string(data.get('hours'))
-                
-                cur.execute(f"UPDATE contacts SET address = {address}, phone = {phone}, email = {email}, hours = {hours}, updated_at = CURRENT_TIMESTAMP WHERE id = (SELECT id FROM contacts ORDER BY id DESC LIMIT 1)")
-                conn.commit()
+            if method == 'POST':
+                body_data = json.loads(event.get('body', '{}'))
+                post_type = body_data.get('type')
                 
-                cur.close()
-                conn.close()
-                
-                return {
-                    'statusCode': 200,
-                    'headers': headers,
-                    'isBase64Encoded': False,
-                    'body': json.dumps({'success': True, 'message': 'Контакты обновлены'})
-                }
+                if post_type == 'gallery':
+                    data = body_data.get('data', {})
+                    cur.execute(
+                        "INSERT INTO gallery_photos (url, title, description, width, height, placeholder) VALUES (%s, %s, %s, %s, %s, %s) RETURNING id",
+                        (data.get('url'), data.get('title'), data.get('description', ''), data.get('width'), data.get('height'), data.get('placeholder'))
+                    )
+                    photo_id = cur.fetchone()['id']
+                    if data.get('variants'):
+                        save_gallery_variants(cur, photo_id, data['variants'])
+                    conn.commit()
+                    invalidate_cache()
+                    
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 201,
+                        'headers': headers,
+                        'isBase64Encoded': False,
+                        'body': json.dumps({
+                            'success': True,
+                            'id': str(photo_id),
+                            'url': data.get('url'),
+                            'title': data.get('title'),
+                            'description': data.get('description', '')
+                        })
+                    }
             
-            if update_type == 'sports':
-                sports_data = body_data.get('data', [])
+            if method == 'PUT':
+                body_data = json.loads(event.get('body', '{}'))
+                update_type = body_data.get('type')
                 
-                for sport in sports_data:
-                    sport_id = escape_sql_string(sport.get('id'))
-                    name = escape_sql_string(sport.get('name'))
-                    image = escape_sql_string(sport.get('image'))
-                    video = escape_sql_string(sport.get('video'))
-                    
-                    cur.execute(f"UPDATE sports SET name = {name}, image = {image}, video = {video}, updated_at = CURRENT_TIMESTAMP WHERE id = {sport_id}")
+                if update_type == 'gallery':
+                    data = body_data.get('data', {})
+                    photo_id = int(data.get('id'))
+                    cur.execute(
+                        "UPDATE gallery_photos SET url = %s, title = %s, description = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                        (data.get('url'), data.get('title'), data.get('description', ''), photo_id)
+                    )
+                    if 'variants' in data:
+                        cur.execute(
+                            "UPDATE gallery_photos SET width = %s, height = %s, placeholder = %s WHERE id = %s",
+                            (data.get('width'), data.get('height'), data.get('placeholder'), photo_id)
+                        )
+                        save_gallery_variants(cur, photo_id, data.get('variants') or [])
+                    conn.commit()
+                    invalidate_cache()
                     
-                    cur.execute(f"SELECT id FROM sport_rules WHERE sport_id = {sport_id} ORDER BY display_order")
-                    existing_rules = cur.fetchall()
+                    cur.close()
                     
-                    for idx, rule in enumerate(sport.get('rules', [])):
-                        rule_text = escape_sql_string(rule)
-                        if idx < len(existing_rules):
-                            rule_id = int(existing_rules[idx]['id'])
-                            cur.execute(f"UPDATE sport_rules SET rule_text = {rule_text} WHERE id = {rule_id}")
-                        else:
-                            display_order = idx + 1
-                            cur.execute(f"INSERT INTO sport_rules (sport_id, rule_text, display_order) VALUES ({sport_id}, {rule_text}, {display_order})")
+                    return {
+                        'statusCode': 200,
+                        'headers': headers,
+                        'isBase64Encoded': False,
+                        'body': json.dumps({'success': True, 'message': 'Фото обновлено'})
+                    }
+                
+                if update_type == 'contacts':
+                    data = body_data.get('data', {})
+                    cur.execute(
+                        "UPDATE contacts SET address = %s, phone = %s, email = %s, hours = %s, updated_at = CURRENT_TIMESTAMP WHERE id = (SELECT id FROM contacts ORDER BY id DESC LIMIT 1)",
+                        (data.get('address'), data.get('phone'), data.get('email'), data.get('hours'))
+                    )
+                    refresh_snapshot(cur)
+                    conn.commit()
+                    invalidate_cache()
                     
-                    cur.execute(f"SELECT id FROM sport_safety WHERE sport_id = {sport_id} ORDER BY display_order")
-                    existing_safety = cur.fetchall()
+                    cur.close()
                     
-                    for idx, safety_item in enumerate(sport.get('safety', [])):
-                        safety_text = escape_sql_string(safety_item)
-                        if idx < len(existing_safety):
-                            safety_id = int(existing_safety[idx]['id'])
-                            cur.execute(f"UPDATE sport_safety SET safety_text = {safety_text} WHERE id = {safety_id}")
-                        else:
-                            display_order = idx + 1
-                            cur.execute(f"INSERT INTO sport_safety (sport_id, safety_text, display_order) VALUES ({sport_id}, {safety_text}, {display_order})")
-                
-                conn.commit()
+                    return {
+                        'statusCode': 200,
+                        'headers': headers,
+                        'isBase64Encoded': False,
+                        'body': json.dumps({'success': True, 'message': 'Контакты обновлены'})
+                    }
                 
-                cur.close()
-                conn.close()
+                if update_type == 'sports':
+                    sports_data = body_data.get('data', [])
+                    save_sports(cur, sports_data)
+                    refresh_snapshot(cur)
+                    
+                    conn.commit()
+                    invalidate_cache()
+                    
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': headers,
+                        'isBase64Encoded': False,
+                        'body': json.dumps({'success': True, 'message': 'Виды спорта обновлены'})
+                    }
                 
-                return {
-                    'statusCode': 200,
-                    'headers': headers,
-                    'isBase64Encoded': False,
-                    'body': json.dumps({'success': True, 'message': 'Виды спорта обновлены'})
-                }
+                if update_type == 'partners':
+                    partners_data = body_data.get('data', [])
+                    
+                    cur.execute("DELETE FROM partners")
+                    cur.execute(
+                        "INSERT INTO partners (name, url, display_order) SELECT * FROM unnest(%s::varchar[], %s::varchar[], %s::int[])",
+                        (
+                            [partner.get('name') for partner in partners_data],
+                            [partner.get('url') for partner in partners_data],
+                            list(range(1, len(partners_data) + 1))
+                        )
+                    )
+                    refresh_snapshot(cur)
+                    
+                    conn.commit()
+                    invalidate_cache()
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': headers,
+                        'isBase64Encoded': False,
+                        'body': json.dumps({'success': True, 'message': 'Партнёры обновлены'})
+                    }
             
-            if update_type == 'partners':
-                partners_data = body_data.get('data', [])
+            if method == 'DELETE':
+                params = event.get('queryStringParameters', {})
+                delete_type = params.get('type')
                 
-                cur.execute("DELETE FROM partners")
-                
-                for idx, partner in enumerate(partners_data):
-                    name = escape_sql_string(partner.get('name'))
-                    url = escape_sql_string(partner.get('url'))
-                    display_order = idx + 1
+                if delete_type == 'gallery':
+                    photo_id = int(params.get('id', 0))
+                    cur.execute("DELETE FROM gallery_photos WHERE id = %s", (photo_id,))
+                    conn.commit()
+                    invalidate_cache()
                     
-                    cur.execute(f"INSERT INTO partners (name, url, display_order) VALUES ({name}, {url}, {display_order})")
-                
-                conn.commit()
-                cur.close()
-                conn.close()
-                
-                return {
-                    'statusCode': 200,
-                    'headers': headers,
-                    'isBase64Encoded': False,
-                    'body': json.dumps({'success': True, 'message': 'Партнёры обновлены'})
-                }
-        
-        if method == 'DELETE':
-            params = event.get('queryStringParameters', {})
-            delete_type = params.get('type')
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': headers,
+                        'isBase64Encoded': False,
+                        'body': json.dumps({'success': True, 'message': 'Фото удалено'})
+                    }
+            
+            cur.close()
+            
+            return {
+                'statusCode': 405,
+                'headers': headers,
+                'isBase64Encoded': False,
+                'body': json.dumps({'error': 'Method not allowed'})
+            }
             
-            if delete_type == 'gallery':
-                photo_id = int(params.get('id', 0))
-                cur.execute(f"DELETE FROM gallery_photos WHERE id = {photo_id}")
-                conn.commit()
-                
-                cur.close()
-                conn.close()
-                
-                return {
-                    'statusCode': 200,
-                    'headers': headers,
-                    'isBase64Encoded': False,
-                    'body': json.dumps({'success': True, 'message': 'Фото удалено'})
-                }
-        
-        cur.close()
-        conn.close()
-        
-        return {
-            'statusCode': 405,
-            'headers': headers,
-            'isBase64Encoded': False,
-            'body': json.dumps({'error': 'Method not allowed'})
-        }
-        
     except Exception as e:
         return {
             'statusCode': 500,
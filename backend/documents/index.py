@@ -0,0 +1,436 @@
+'''
+Business: Выдача актуальных PDF-документов (правила, цены, льготы, расписание) и загрузка их новых версий
+Args: event - dict с httpMethod, queryStringParameters (type), headers (Range, If-None-Match, If-Modified-Since),
+      body - JSON {docType, fileData} или шаг загрузки по частям {action: init|chunk|finalize, ...}
+      context - object с атрибутами request_id, function_name
+Returns: HTTP response dict с PDF целиком (200), его частью (206), 304 без тела или результатом загрузки
+'''
+
+import base64
+import binascii
+import json
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Any, Optional, Tuple
+
+from db import get_connection
+from instrument import instrumented
+
+DOC_TYPES = ('rules', 'prices', 'benefits', 'schedule')
+# Последние версии документов держатся в памяти тёплого экземпляра; лимит в байтах, 0 отключает кэш
+CACHE_BYTES = int(os.environ.get('DOCUMENTS_CACHE_BYTES', str(32 * 1024 * 1024)))
+# Файлы больше этого размера не кэшируются, а диапазоны для них читаются из Postgres через substring
+CACHE_MAX_ITEM = int(os.environ.get('DOCUMENTS_CACHE_MAX_ITEM', str(8 * 1024 * 1024)))
+MAX_AGE = int(os.environ.get('DOCUMENTS_MAX_AGE', '300'))
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Одна часть загрузки в декодированном виде; файл целиком в памяти функции не собирается
+MAX_CHUNK_BYTES = int(os.environ.get('DOCUMENTS_MAX_CHUNK_BYTES', str(4 * 1024 * 1024)))
+# Сколько последних версий каждого типа хранить; более старые удаляются при загрузке новой
+KEEP_VERSIONS = max(1, int(os.environ.get('DOCUMENTS_KEEP_VERSIONS', '1')))
+# Брошенные незавершённые загрузки удаляются спустя столько часов
+UPLOAD_TTL_HOURS = int(os.environ.get('DOCUMENTS_UPLOAD_TTL_HOURS', '24'))
+
+_blob_cache: 'OrderedDict[int, bytes]' = OrderedDict()
+_cache_size = 0
+_cache_lock = threading.Lock()
+
+PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Range, If-None-Match, If-Modified-Since, If-Range',
+    'Access-Control-Max-Age': '86400'
+}
+JSON_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+def get_cached_blob(document_id: int) -> Optional[bytes]:
+    with _cache_lock:
+        data = _blob_cache.get(document_id)
+        if data is not None:
+            _blob_cache.move_to_end(document_id)
+        return data
+
+def set_cached_blob(document_id: int, data: bytes) -> None:
+    global _cache_size
+    if len(data) > min(CACHE_BYTES, CACHE_MAX_ITEM):
+        return
+    with _cache_lock:
+        if document_id in _blob_cache:
+            return
+        _blob_cache[document_id] = data
+        _cache_size += len(data)
+        while _cache_size > CACHE_BYTES:
+            _, evicted = _blob_cache.popitem(last=False)
+            _cache_size -= len(evicted)
+
+def get_request_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    request_headers = event.get('headers') or {}
+    lowered = name.lower()
+    for key, value in request_headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Слабые валидаторы W/"..." сравниваются по значению
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+def not_modified_since(if_modified_since: Optional[str], uploaded_at: datetime) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # В HTTP-датах нет долей секунды
+    return uploaded_at.replace(microsecond=0) <= since
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    '''
+    Разбирает одиночный диапазон bytes=start-end; None - отдать файл целиком,
+    (-1, -1) - диапазон невыполним (416)
+    '''
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        # Несколько диапазонов и прочие единицы не поддерживаются - по RFC 9110 их можно игнорировать
+        return None
+    start_text, end_text = match.groups()
+    if start_text == '':
+        suffix = int(end_text)
+        if suffix == 0 or size == 0:
+            return -1, -1
+        return max(0, size - suffix), size - 1
+    start = int(start_text)
+    end = min(int(end_text), size - 1) if end_text else size - 1
+    if start >= size or start > end:
+        return -1, -1
+    return start, end
+
+def fetch_latest(cur, doc_type: str) -> Optional[Tuple[int, str, datetime, int]]:
+    cur.execute(
+        """
+        SELECT id, mime_type, uploaded_at, octet_length(file_data)
+        FROM documents
+        WHERE doc_type = %s
+        ORDER BY uploaded_at DESC
+        LIMIT 1
+        """,
+        (doc_type,)
+    )
+    return cur.fetchone()
+
+def fetch_bytes(cur, document_id: int, start: int, length: int) -> bytes:
+    # substring по bytea выполняется на сервере: по сети идёт только запрошенный кусок
+    cur.execute('SELECT substring(file_data FROM %s FOR %s) FROM documents WHERE id = %s', (start + 1, length, document_id))
+    return bytes(cur.fetchone()[0])
+
+def serve_document(event: Dict[str, Any], doc_type: str) -> Dict[str, Any]:
+    with get_connection() as conn:
+        cur = conn.cursor()
+        latest = fetch_latest(cur, doc_type)
+        
+        if latest is None:
+            cur.close()
+            return {
+                'statusCode': 404,
+                'headers': JSON_HEADERS,
+                'isBase64Encoded': False,
+                'body': json.dumps({'error': 'Document not found'})
+            }
+        
+        document_id, mime_type, uploaded_at, size = latest
+        uploaded_at = uploaded_at.replace(tzinfo=timezone.utc)
+        etag = f'"{document_id}-{int(uploaded_at.timestamp())}"'
+        headers = {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'ETag, Last-Modified, Content-Range, Accept-Ranges',
+            'Cache-Control': f'public, max-age={MAX_AGE}',
+            'ETag': etag,
+            'Last-Modified': format_datetime(uploaded_at, usegmt=True),
+            'Accept-Ranges': 'bytes'
+        }
+        
+        if_none_match = get_request_header(event, 'If-None-Match')
+        if etag_matches(if_none_match, etag) or (
+            if_none_match is None and not_modified_since(get_request_header(event, 'If-Modified-Since'), uploaded_at)
+        ):
+            cur.close()
+            return {'statusCode': 304, 'headers': headers, 'isBase64Encoded': False, 'body': ''}
+        
+        byte_range = parse_range(get_request_header(event, 'Range'), size)
+        if_range = get_request_header(event, 'If-Range')
+        if byte_range is not None and if_range and if_range != etag:
+            # Клиент докачивает старую версию - отдаём новую целиком
+            byte_range = None
+        
+        if byte_range == (-1, -1):
+            cur.close()
+            return {
+                'statusCode': 416,
+                'headers': {**headers, 'Content-Range': f'bytes */{size}'},
+                'isBase64Encoded': False,
+                'body': ''
+            }
+        
+        data = get_cached_blob(document_id)
+        if data is None and (byte_range is None or size <= CACHE_MAX_ITEM):
+            data = fetch_bytes(cur, document_id, 0, size)
+            set_cached_blob(document_id, data)
+        
+        if byte_range is None:
+            status, payload = 200, data
+        else:
+            start, end = byte_range
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+            payload = data[start:end + 1] if data is not None else fetch_bytes(cur, document_id, start, end - start + 1)
+        cur.close()
+    
+    return {
+        'statusCode': status,
+        'headers': {
+            **headers,
+            'Content-Type': mime_type,
+            'Content-Disposition': f'inline; filename="{doc_type}.pdf"'
+        },
+        'isBase64Encoded': True,
+        'body': base64.b64encode(payload).decode('ascii')
+    }
+
+def prune_versions(cur, doc_type: str) -> int:
+    cur.execute(
+        """
+        DELETE FROM documents
+        WHERE doc_type = %s AND id NOT IN (
+            SELECT id FROM documents WHERE doc_type = %s ORDER BY uploaded_at DESC LIMIT %s
+        )
+        """,
+        (doc_type, doc_type, KEEP_VERSIONS)
+    )
+    return cur.rowcount
+
+def start_upload(cur, doc_type: str) -> str:
+    cur.execute(
+        "DELETE FROM document_uploads WHERE created_at < CURRENT_TIMESTAMP - make_interval(hours => %s)",
+        (UPLOAD_TTL_HOURS,)
+    )
+    upload_id = uuid.uuid4().hex
+    cur.execute(
+        "INSERT INTO document_uploads (id, doc_type, mime_type) VALUES (%s, %s, 'application/pdf')",
+        (upload_id, doc_type)
+    )
+    return upload_id
+
+def store_chunk(cur, upload_id: str, seq: int, data: bytes) -> bool:
+    # Повтор той же части после сетевой ошибки перезаписывает её, а не дублирует
+    cur.execute(
+        """
+        INSERT INTO document_upload_chunks (upload_id, seq, data)
+        SELECT id, %s, %s FROM document_uploads WHERE id = %s
+        ON CONFLICT (upload_id, seq) DO UPDATE SET data = EXCLUDED.data
+        """,
+        (seq, data, upload_id)
+    )
+    return cur.rowcount == 1
+
+def finalize_upload(cur, upload_id: str, expected_chunks: Optional[int]) -> Optional[Dict[str, Any]]:
+    '''
+    Склеивает части на стороне Postgres (string_agg по bytea) в новую версию документа,
+    удаляет временные данные и устаревшие версии. None, если загрузка не найдена или неполна
+    '''
+    cur.execute(
+        """
+        SELECT u.doc_type, COUNT(c.seq), COALESCE(MAX(c.seq), -1)
+        FROM document_uploads u
+        LEFT JOIN document_upload_chunks c ON c.upload_id = u.id
+        WHERE u.id = %s
+        GROUP BY u.doc_type
+        """,
+        (upload_id,)
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    doc_type, chunk_count, last_seq = row
+    if chunk_count == 0 or last_seq != chunk_count - 1 or (expected_chunks is not None and chunk_count != expected_chunks):
+        return None
+    
+    cur.execute(
+        """
+        INSERT INTO documents (doc_type, file_data, mime_type)
+        SELECT u.doc_type, string_agg(c.data, ''::bytea ORDER BY c.seq), u.mime_type
+        FROM document_uploads u
+        JOIN document_upload_chunks c ON c.upload_id = u.id
+        WHERE u.id = %s
+        GROUP BY u.doc_type, u.mime_type
+        RETURNING id, octet_length(file_data)
+        """,
+        (upload_id,)
+    )
+    document_id, size = cur.fetchone()
+    cur.execute('DELETE FROM document_uploads WHERE id = %s', (upload_id,))
+    pruned = prune_versions(cur, doc_type)
+    return {'success': True, 'id': document_id, 'size': size, 'pruned': pruned}
+
+def handle_chunked_upload(body_data: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    action = body_data.get('action')
+    
+    if action == 'init':
+        doc_type = body_data.get('docType')
+        if doc_type not in DOC_TYPES:
+            return 400, {'error': 'Unknown document type'}
+        with get_connection() as conn:
+            cur = conn.cursor()
+            upload_id = start_upload(cur, doc_type)
+            conn.commit()
+            cur.close()
+        return 200, {'uploadId': upload_id, 'maxChunkBytes': MAX_CHUNK_BYTES}
+    
+    upload_id = body_data.get('uploadId')
+    if not isinstance(upload_id, str) or not upload_id:
+        return 400, {'error': 'uploadId is required'}
+    
+    if action == 'chunk':
+        seq = body_data.get('index')
+        chunk_data = body_data.get('data')
+        if not isinstance(seq, int) or seq < 0 or not chunk_data:
+            return 400, {'error': 'index and data are required'}
+        # Размер проверяется до декодирования: base64 длиннее исходных байтов на треть
+        if len(chunk_data) > (MAX_CHUNK_BYTES + 2) // 3 * 4:
+            return 413, {'error': 'Chunk too large', 'maxChunkBytes': MAX_CHUNK_BYTES}
+        try:
+            chunk_bytes = binascii.a2b_base64(chunk_data)
+        except binascii.Error:
+            return 400, {'error': 'data must be valid base64'}
+        with get_connection() as conn:
+            cur = conn.cursor()
+            stored = store_chunk(cur, upload_id, seq, chunk_bytes)
+            conn.commit()
+            cur.close()
+        if not stored:
+            return 404, {'error': 'Upload not found'}
+        return 200, {'success': True, 'index': seq, 'size': len(chunk_bytes)}
+    
+    if action == 'finalize':
+        expected_chunks = body_data.get('chunks')
+        with get_connection() as conn:
+            cur = conn.cursor()
+            result = finalize_upload(cur, upload_id, expected_chunks if isinstance(expected_chunks, int) else None)
+            conn.commit()
+            cur.close()
+        if result is None:
+            return 409, {'error': 'Upload not found or incomplete'}
+        return 200, result
+    
+    return 400, {'error': 'Unknown action'}
+
+@instrumented
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    method: str = event.get('httpMethod', 'GET')
+    
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': PREFLIGHT_HEADERS,
+            'body': '',
+            'isBase64Encoded': False
+        }
+    
+    try:
+        if method == 'GET':
+            params = event.get('queryStringParameters') or {}
+            doc_type = params.get('type')
+            if doc_type not in DOC_TYPES:
+                return {
+                    'statusCode': 400,
+                    'headers': JSON_HEADERS,
+                    'isBase64Encoded': False,
+                    'body': json.dumps({'error': 'Unknown document type'})
+                }
+            return serve_document(event, doc_type)
+        
+        if method == 'POST':
+            body_data = json.loads(event.get('body', '{}'))
+            
+            if 'action' in body_data:
+                status, result = handle_chunked_upload(body_data)
+                return {
+                    'statusCode': status,
+                    'headers': JSON_HEADERS,
+                    'isBase64Encoded': False,
+                    'body': json.dumps(result)
+                }
+            
+            doc_type = body_data.get('docType')
+            file_data = body_data.get('fileData')
+            
+            if doc_type not in DOC_TYPES or not file_data:
+                return {
+                    'statusCode': 400,
+                    'headers': JSON_HEADERS,
+                    'isBase64Encoded': False,
+                    'body': json.dumps({'error': 'docType and fileData are required'})
+                }
+            
+            if file_data.startswith('data:'):
+                file_data = file_data.split(',', 1)[1]
+            try:
+                file_bytes = binascii.a2b_base64(file_data)
+            except binascii.Error:
+                return {
+                    'statusCode': 400,
+                    'headers': JSON_HEADERS,
+                    'isBase64Encoded': False,
+                    'body': json.dumps({'error': 'fileData must be valid base64'})
+                }
+            
+            with get_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    """
+                    INSERT INTO documents (doc_type, file_data, mime_type)
+                    VALUES (%s, %s, 'application/pdf')
+                    RETURNING id
+                    """,
+                    (doc_type, file_bytes)
+                )
+                document_id = cur.fetchone()[0]
+                prune_versions(cur, doc_type)
+                conn.commit()
+                cur.close()
+            
+            return {
+                'statusCode': 200,
+                'headers': JSON_HEADERS,
+                'isBase64Encoded': False,
+                'body': json.dumps({'success': True, 'id': document_id, 'size': len(file_bytes)})
+            }
+        
+        return {
+            'statusCode': 405,
+            'headers': JSON_HEADERS,
+            'isBase64Encoded': False,
+            'body': json.dumps({'error': 'Method not allowed'})
+        }
+    
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': JSON_HEADERS,
+            'isBase64Encoded': False,
+            'body': json.dumps({'error': str(e)})
+        }
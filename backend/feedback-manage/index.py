@@ -1,12 +1,293 @@
+import base64
 import json
 import os
-import psycopg2
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
 
+from db import get_connection
+from instrument import dumps, instrumented
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+FEEDBACK_JSON = """json_build_object(
+    'id', id,
+    'name', name,
+    'email', email,
+    'message', message,
+    'created_at', to_char(created_at, 'YYYY-MM-DD"T"HH24:MI:SS.US'),
+    'is_read', is_read,
+    'is_archived', is_archived
+)"""
+
+# action -> (SET clause, predicate that skips rows already in the target state)
+BULK_UPDATES = {
+    'mark_read': ('is_read = TRUE', 'NOT is_read'),
+    'archive': ('is_archived = TRUE', 'NOT is_archived'),
+    'unarchive': ('is_archived = FALSE', 'is_archived')
+}
+
+PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, PUT, DELETE, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Max-Age': '86400'
+}
+JSON_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+def encode_cursor(sort_key: str, feedback_id: int) -> str:
+    raw = f'{sort_key}|{feedback_id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    created_at, feedback_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(created_at), int(feedback_id)
+
+def parse_page_size(value: Optional[str]) -> int:
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(value), MAX_PAGE_SIZE))
+
+def build_feedback_filters(params: Dict[str, str]) -> Tuple[str, List[Any]]:
+    '''
+    Build the WHERE clause for a feedback listing. The leading is_archived
+    predicate and the (created_at, id) keyset match idx_feedback_archived_created_id.
+    '''
+    conditions = ['is_archived = %s']
+    args: List[Any] = [params.get('archived', 'false').lower() == 'true']
+    
+    if params.get('unread', 'false').lower() == 'true':
+        conditions.append('NOT is_read')
+    if params.get('date_from'):
+        conditions.append('created_at >= %s')
+        args.append(datetime.fromisoformat(params['date_from']))
+    if params.get('date_to'):
+        conditions.append('created_at < %s')
+        args.append(datetime.fromisoformat(params['date_to']))
+    if params.get('email'):
+        conditions.append('lower(email) = lower(%s)')
+        args.append(params['email'])
+    if params.get('cursor'):
+        cursor_created_at, cursor_id = decode_cursor(params['cursor'])
+        conditions.append('(created_at, id) < (%s, %s)')
+        args.extend([cursor_created_at, cursor_id])
+    
+    return ' AND '.join(conditions), args
+
+def fetch_feedback_page(cur, params: Dict[str, str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    where_sql, args = build_feedback_filters(params)
+    page_size = parse_page_size(params.get('limit'))
+    
+    cur.execute(f"""
+        SELECT id, name, email, message, created_at, is_read, is_archived
+        FROM t_p40618121_yenisei_sport_hall_1.feedback_messages
+        WHERE {where_sql}
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s
+    """, (*args, page_size + 1))
+    rows = cur.fetchall()
+    
+    feedback_list = []
+    for row in rows[:page_size]:
+        feedback_list.append({
+            'id': row[0],
+            'name': row[1],
+            'email': row[2],
+            'message': row[3],
+            'created_at': row[4].isoformat() if row[4] else None,
+            'is_read': row[5] if row[5] is not None else False,
+            'is_archived': row[6] if row[6] is not None else False
+        })
+    
+    next_cursor = None
+    if len(rows) > page_size:
+        last = rows[page_size - 1]
+        next_cursor = encode_cursor(last[4].isoformat(), last[0])
+    
+    return feedback_list, next_cursor
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    rank, feedback_id = raw.rsplit('|', 1)
+    return float(rank), int(feedback_id)
+
+def search_feedback(cur, params: Dict[str, str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    '''
+    Full-text search over name, email and message. order=rank (default) sorts by
+    ts_rank_cd with a (rank, id) keyset: the GIN index narrows the candidates and
+    only the matches are ranked. order=recent uses the (created_at, id) keyset, which
+    lets the planner walk idx_feedback_created_at for very common terms.
+    Raises ValueError on an empty query or a malformed cursor.
+    '''
+    query = (params.get('q') or '').strip()
+    if not query:
+        raise ValueError('q is required')
+    page_size = parse_page_size(params.get('limit'))
+    
+    conditions = ['search_vector @@ query']
+    args: List[Any] = [query, query]
+    if params.get('archived') is not None:
+        conditions.append('is_archived = %s')
+        args.append(params['archived'].lower() == 'true')
+    
+    by_recent = params.get('order') == 'recent'
+    sort_key = 'created_at' if by_recent else 'rank'
+    cursor_sql = ''
+    if params.get('cursor'):
+        if by_recent:
+            cursor_created_at, cursor_id = decode_cursor(params['cursor'])
+            cursor_sql = 'WHERE (created_at, id) < (%s, %s)'
+            args.extend([cursor_created_at, cursor_id])
+        else:
+            cursor_rank, cursor_id = decode_search_cursor(params['cursor'])
+            cursor_sql = 'WHERE (rank, id) < (%s::real, %s)'
+            args.extend([cursor_rank, cursor_id])
+    
+    cur.execute(f"""
+        SELECT id, name, email, message, created_at, is_read, is_archived, rank
+        FROM (
+            SELECT f.id, f.name, f.email, f.message, f.created_at, f.is_read, f.is_archived,
+                   ts_rank_cd(f.search_vector, query) AS rank
+            FROM t_p40618121_yenisei_sport_hall_1.feedback_messages f,
+                 (SELECT websearch_to_tsquery('russian', %s) || websearch_to_tsquery('simple', %s) AS query) q
+            WHERE {' AND '.join(conditions)}
+        ) ranked
+        {cursor_sql}
+        ORDER BY {sort_key} DESC, id DESC
+        LIMIT %s
+    """, (*args, page_size + 1))
+    rows = cur.fetchall()
+    
+    results = []
+    for row in rows[:page_size]:
+        results.append({
+            'id': row[0],
+            'name': row[1],
+            'email': row[2],
+            'message': row[3],
+            'created_at': row[4].isoformat() if row[4] else None,
+            'is_read': row[5] if row[5] is not None else False,
+            'is_archived': row[6] if row[6] is not None else False,
+            'rank': row[7]
+        })
+    
+    next_cursor = None
+    if len(rows) > page_size:
+        last = rows[page_size - 1]
+        next_cursor = encode_cursor(last[4].isoformat() if by_recent else repr(last[7]), last[0])
+    
+    return results, next_cursor
+
+def build_bulk_where(body_data: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    '''
+    Rows targeted by a bulk action: an explicit ids list and/or a filter
+    (unread, archived, older_than). Raises ValueError when neither is given,
+    so a malformed request never touches the whole table.
+    '''
+    conditions = []
+    args: List[Any] = []
+    
+    ids = body_data.get('ids')
+    if ids is not None:
+        if not isinstance(ids, list):
+            raise ValueError('ids must be a list')
+        conditions.append('id = ANY(%s)')
+        args.append([int(feedback_id) for feedback_id in ids])
+    
+    bulk_filter = body_data.get('filter') or {}
+    if not isinstance(bulk_filter, dict):
+        raise ValueError('filter must be an object')
+    if 'unread' in bulk_filter:
+        conditions.append('is_read = %s')
+        args.append(not bulk_filter['unread'])
+    if 'archived' in bulk_filter:
+        conditions.append('is_archived = %s')
+        args.append(bool(bulk_filter['archived']))
+    if bulk_filter.get('older_than'):
+        try:
+            older_than = datetime.fromisoformat(bulk_filter['older_than'])
+        except (TypeError, ValueError):
+            raise ValueError('older_than must be an ISO 8601 date')
+        conditions.append('created_at < %s')
+        args.append(older_than)
+    
+    if not conditions:
+        raise ValueError('ids or filter required')
+    
+    return ' AND '.join(conditions), args
+
+def fetch_counters(cur) -> Tuple[int, int, int, int]:
+    cur.execute("""
+        SELECT total_count, unread_count, archived_count, version
+        FROM t_p40618121_yenisei_sport_hall_1.feedback_counters
+        WHERE id = 1
+    """)
+    return cur.fetchone() or (0, 0, 0, 0)
+
+def fetch_dashboard(cur, page_size: int) -> Dict[str, Any]:
+    '''
+    First page of active and archived feedback plus counters in a single round trip.
+    '''
+    cur.execute(f"""
+        WITH active AS (
+            SELECT id, name, email, message, created_at, is_read, is_archived
+            FROM t_p40618121_yenisei_sport_hall_1.feedback_messages
+            WHERE is_archived = FALSE
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+        ), archived AS (
+            SELECT id, name, email, message, created_at, is_read, is_archived
+            FROM t_p40618121_yenisei_sport_hall_1.feedback_messages
+            WHERE is_archived = TRUE
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+        )
+        SELECT
+            (SELECT COALESCE(json_agg({FEEDBACK_JSON} ORDER BY created_at DESC, id DESC), '[]'::json) FROM active),
+            (SELECT COALESCE(json_agg({FEEDBACK_JSON} ORDER BY created_at DESC, id DESC), '[]'::json) FROM archived),
+            COALESCE(c.total_count, 0),
+            COALESCE(c.unread_count, 0),
+            COALESCE(c.archived_count, 0)
+        FROM (SELECT 1) AS one
+        LEFT JOIN t_p40618121_yenisei_sport_hall_1.feedback_counters c ON c.id = 1
+    """, (page_size + 1, page_size + 1))
+    active, archived, total_count, unread_count, archived_count = cur.fetchone()
+    
+    def page(items: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # to_char always prints six fractional digits; re-emit through isoformat() so created_at
+        # and the cursor look exactly like list mode (which drops a zero fraction)
+        for item in items:
+            if item['created_at']:
+                item['created_at'] = datetime.fromisoformat(item['created_at']).isoformat()
+        if len(items) <= page_size:
+            return items, None
+        last = items[page_size - 1]
+        return items[:page_size], encode_cursor(last['created_at'], last['id'])
+    
+    active_page, next_cursor_active = page(active)
+    archived_page, next_cursor_archived = page(archived)
+    
+    return {
+        'active': active_page,
+        'archived': archived_page,
+        'next_cursor_active': next_cursor_active,
+        'next_cursor_archived': next_cursor_archived,
+        'total_count': total_count,
+        'unread_count': unread_count,
+        'archived_count': archived_count
+    }
+
+@instrumented
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Manage feedback messages - get list with filters, mark as read, archive/unarchive, delete
-    Args: event with httpMethod, queryStringParameters (archived, id), body for updates
+    Args: event with httpMethod, queryStringParameters (archived, unread, date_from, date_to, email,
+                limit, cursor, id, mode=counters|dashboard|search, since, q, order=rank|recent),
+                body with action and optional ids/filter for bulk updates and deletes
           context with request_id
     Returns: HTTP response with feedback data or operation result
     '''
@@ -15,12 +296,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     if method == 'OPTIONS':
         return {
             'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Max-Age': '86400'
-            },
+            'headers': PREFLIGHT_HEADERS,
             'body': ''
         }
     
@@ -28,171 +304,250 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     if not db_url:
         return {
             'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': JSON_HEADERS,
             'body': json.dumps({'error': 'Database not configured'})
         }
     
     try:
-        conn = psycopg2.connect(db_url)
-        cur = conn.cursor()
-        
-        if method == 'GET':
-            params = event.get('queryStringParameters', {}) or {}
-            show_archived = params.get('archived', 'false').lower() == 'true'
+        with get_connection() as conn:
+            cur = conn.cursor()
             
-            cur.execute("""
-                SELECT id, name, email, message, created_at, is_read, is_archived
-                FROM t_p40618121_yenisei_sport_hall_1.feedback_messages 
-                WHERE is_archived = %s
-                ORDER BY created_at DESC
-            """, (show_archived,))
-            
-            feedback_list = []
-            for row in cur.fetchall():
-                feedback_list.append({
-                    'id': row[0],
-                    'name': row[1],
-                    'email': row[2],
-                    'message': row[3],
-                    'created_at': row[4].isoformat() if row[4] else None,
-                    'is_read': row[5] if row[5] is not None else False,
-                    'is_archived': row[6] if row[6] is not None else False
-                })
-            
-            cur.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    COUNT(*) FILTER (WHERE NOT is_read) as unread,
-                    COUNT(*) FILTER (WHERE is_archived) as archived
-                FROM t_p40618121_yenisei_sport_hall_1.feedback_messages
-            """)
-            stats = cur.fetchone()
-            
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'isBase64Encoded': False,
-                'body': json.dumps({
-                    'feedback': feedback_list,
-                    'total_count': stats[0],
-                    'unread_count': stats[1],
-                    'archived_count': stats[2]
-                })
-            }
-        
-        elif method == 'PUT':
-            params = event.get('queryStringParameters', {}) or {}
-            feedback_id = params.get('id')
-            body_data = json.loads(event.get('body', '{}'))
-            action = body_data.get('action', 'mark_read')
+            if method == 'GET':
+                params = event.get('queryStringParameters', {}) or {}
+                
+                if params.get('mode') == 'counters':
+                    counters = fetch_counters(cur)
+                    cur.close()
+                    
+                    since = params.get('since')
+                    if since is not None and since == str(counters[3]):
+                        body = {'changed': False, 'version': counters[3]}
+                    else:
+                        body = {
+                            'changed': True,
+                            'version': counters[3],
+                            'total_count': counters[0],
+                            'unread_count': counters[1],
+                            'archived_count': counters[2]
+                        }
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': JSON_HEADERS,
+                        'isBase64Encoded': False,
+                        'body': json.dumps(body)
+                    }
+                
+                if params.get('mode') == 'search':
+                    try:
+                        results, next_cursor = search_feedback(cur, params)
+                    except ValueError:
+                        cur.close()
+                        return {
+                            'statusCode': 400,
+                            'headers': JSON_HEADERS,
+                            'body': json.dumps({'error': 'Invalid query, limit or cursor'})
+                        }
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': JSON_HEADERS,
+                        'isBase64Encoded': False,
+                        'body': dumps({'feedback': results, 'next_cursor': next_cursor})
+                    }
+                
+                if params.get('mode') == 'dashboard':
+                    try:
+                        dashboard = fetch_dashboard(cur, parse_page_size(params.get('limit')))
+                    except ValueError:
+                        cur.close()
+                        return {
+                            'statusCode': 400,
+                            'headers': JSON_HEADERS,
+                            'body': json.dumps({'error': 'Invalid limit'})
+                        }
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': JSON_HEADERS,
+                        'isBase64Encoded': False,
+                        'body': dumps(dashboard)
+                    }
+                
+                try:
+                    feedback_list, next_cursor = fetch_feedback_page(cur, params)
+                except ValueError:
+                    cur.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': JSON_HEADERS,
+                        'body': json.dumps({'error': 'Invalid limit, cursor or date filter'})
+                    }
+                
+                stats = fetch_counters(cur)
+                
+                cur.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': JSON_HEADERS,
+                    'isBase64Encoded': False,
+                    'body': dumps({
+                        'feedback': feedback_list,
+                        'next_cursor': next_cursor,
+                        'total_count': stats[0],
+                        'unread_count': stats[1],
+                        'archived_count': stats[2]
+                    })
+                }
             
-            if not feedback_id:
+            elif method == 'PUT':
+                params = event.get('queryStringParameters', {}) or {}
+                feedback_id = params.get('id')
+                body_data = json.loads(event.get('body') or '{}')
+                action = body_data.get('action', 'mark_read')
+                
+                if not feedback_id and ('ids' in body_data or 'filter' in body_data):
+                    if action not in BULK_UPDATES:
+                        cur.close()
+                        return {
+                            'statusCode': 400,
+                            'headers': JSON_HEADERS,
+                            'body': json.dumps({'error': f'Unknown action: {action}'})
+                        }
+                    try:
+                        where_sql, args = build_bulk_where(body_data)
+                    except (TypeError, ValueError) as e:
+                        cur.close()
+                        return {
+                            'statusCode': 400,
+                            'headers': JSON_HEADERS,
+                            'body': json.dumps({'error': f'Invalid bulk request: {str(e)}'})
+                        }
+                    
+                    set_sql, pending_sql = BULK_UPDATES[action]
+                    cur.execute(f"""
+                        UPDATE t_p40618121_yenisei_sport_hall_1.feedback_messages
+                        SET {set_sql}
+                        WHERE {where_sql} AND {pending_sql}
+                    """, args)
+                    affected = cur.rowcount
+                    
+                    conn.commit()
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': JSON_HEADERS,
+                        'isBase64Encoded': False,
+                        'body': json.dumps({'message': 'Success', 'affected': affected})
+                    }
+                
+                if not feedback_id:
+                    cur.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': JSON_HEADERS,
+                        'body': json.dumps({'error': 'Feedback ID required'})
+                    }
+                
+                if action == 'mark_read':
+                    cur.execute("""
+                        UPDATE t_p40618121_yenisei_sport_hall_1.feedback_messages 
+                        SET is_read = TRUE 
+                        WHERE id = %s
+                    """, (feedback_id,))
+                elif action == 'archive':
+                    cur.execute("""
+                        UPDATE t_p40618121_yenisei_sport_hall_1.feedback_messages 
+                        SET is_archived = TRUE 
+                        WHERE id = %s
+                    """, (feedback_id,))
+                elif action == 'unarchive':
+                    cur.execute("""
+                        UPDATE t_p40618121_yenisei_sport_hall_1.feedback_messages 
+                        SET is_archived = FALSE 
+                        WHERE id = %s
+                    """, (feedback_id,))
+                
+                conn.commit()
                 cur.close()
-                conn.close()
+                
                 return {
-                    'statusCode': 400,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({'error': 'Feedback ID required'})
+                    'statusCode': 200,
+                    'headers': JSON_HEADERS,
+                    'isBase64Encoded': False,
+                    'body': json.dumps({'message': 'Success'})
                 }
             
-            if action == 'mark_read':
+            elif method == 'DELETE':
+                params = event.get('queryStringParameters', {}) or {}
+                feedback_id = params.get('id')
+                body_data = json.loads(event.get('body') or '{}')
+                
+                if not feedback_id and ('ids' in body_data or 'filter' in body_data):
+                    try:
+                        where_sql, args = build_bulk_where(body_data)
+                    except (TypeError, ValueError) as e:
+                        cur.close()
+                        return {
+                            'statusCode': 400,
+                            'headers': JSON_HEADERS,
+                            'body': json.dumps({'error': f'Invalid bulk request: {str(e)}'})
+                        }
+                    
+                    cur.execute(f"""
+                        DELETE FROM t_p40618121_yenisei_sport_hall_1.feedback_messages
+                        WHERE {where_sql}
+                    """, args)
+                    affected = cur.rowcount
+                    
+                    conn.commit()
+                    cur.close()
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': JSON_HEADERS,
+                        'isBase64Encoded': False,
+                        'body': json.dumps({'message': 'Deleted', 'affected': affected})
+                    }
+                
+                if not feedback_id:
+                    cur.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': JSON_HEADERS,
+                        'body': json.dumps({'error': 'Feedback ID required'})
+                    }
+                
                 cur.execute("""
-                    UPDATE t_p40618121_yenisei_sport_hall_1.feedback_messages 
-                    SET is_read = TRUE 
+                    DELETE FROM t_p40618121_yenisei_sport_hall_1.feedback_messages 
                     WHERE id = %s
                 """, (feedback_id,))
-            elif action == 'archive':
-                cur.execute("""
-                    UPDATE t_p40618121_yenisei_sport_hall_1.feedback_messages 
-                    SET is_archived = TRUE 
-                    WHERE id = %s
-                """, (feedback_id,))
-            elif action == 'unarchive':
-                cur.execute("""
-                    UPDATE t_p40618121_yenisei_sport_hall_1.feedback_messages 
-                    SET is_archived = FALSE 
-                    WHERE id = %s
-                """, (feedback_id,))
-            
-            conn.commit()
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'isBase64Encoded': False,
-                'body': json.dumps({'message': 'Success'})
-            }
-        
-        elif method == 'DELETE':
-            params = event.get('queryStringParameters', {}) or {}
-            feedback_id = params.get('id')
-            
-            if not feedback_id:
+                
+                conn.commit()
                 cur.close()
-                conn.close()
+                
                 return {
-                    'statusCode': 400,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({'error': 'Feedback ID required'})
+                    'statusCode': 200,
+                    'headers': JSON_HEADERS,
+                    'isBase64Encoded': False,
+                    'body': json.dumps({'message': 'Deleted'})
                 }
             
-            cur.execute("""
-                DELETE FROM t_p40618121_yenisei_sport_hall_1.feedback_messages 
-                WHERE id = %s
-            """, (feedback_id,))
-            
-            conn.commit()
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'isBase64Encoded': False,
-                'body': json.dumps({'message': 'Deleted'})
-            }
+            else:
+                cur.close()
+                return {
+                    'statusCode': 405,
+                    'headers': JSON_HEADERS,
+                    'body': json.dumps({'error': 'Method not allowed'})
+                }
         
-        else:
-            cur.close()
-            conn.close()
-            return {
-                'statusCode': 405,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Method not allowed'})
-            }
-    
     except Exception as e:
         return {
             'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': JSON_HEADERS,
             'body': json.dumps({'error': f'Database error: {str(e)}'})
         }
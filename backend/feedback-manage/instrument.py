@@ -0,0 +1,142 @@
+'''
+Business: Замеры вызова функции - число запросов и время в БД, подключение, сериализация; заголовок Server-Timing и JSON-лог
+Args: INSTRUMENTATION из окружения ('0' выключает: декоратор возвращает исходный handler, курсоры и dumps не оборачиваются)
+Returns: instrumented() - декоратор handler; connection_kwargs() - фабрика соединений для пула; record() и dumps() для замеров
+'''
+
+import json
+import os
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+ENABLED = os.environ.get('INSTRUMENTATION', '1') == '1'
+
+_local = threading.local()
+
+
+class Stats:
+    __slots__ = ('queries', 'rows', 'timings')
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.rows = 0
+        self.timings: Dict[str, float] = {}
+
+
+def current() -> Optional[Stats]:
+    return getattr(_local, 'stats', None)
+
+
+def record(name: str, started: float) -> None:
+    stats = current()
+    if stats is not None:
+        stats.timings[name] = stats.timings.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def _timed_dumps(obj: Any, **kwargs: Any) -> str:
+    started = time.perf_counter()
+    body = json.dumps(obj, **kwargs)
+    record('serialize', started)
+    return body
+
+
+dumps = _timed_dumps if ENABLED else json.dumps
+
+_cursor_classes: Dict[type, type] = {}
+
+
+def _instrumented_cursor(base: type) -> type:
+    if base not in _cursor_classes:
+        class InstrumentedCursor(base):
+            def execute(self, query: Any, vars: Any = None) -> Any:
+                started = time.perf_counter()
+                try:
+                    return super().execute(query, vars)
+                finally:
+                    stats = current()
+                    if stats is not None:
+                        stats.queries += 1
+                        stats.rows += max(self.rowcount, 0)
+                        record('db', started)
+
+            def executemany(self, query: Any, vars_list: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    return super().executemany(query, vars_list)
+                finally:
+                    stats = current()
+                    if stats is not None:
+                        stats.queries += 1
+                        stats.rows += max(self.rowcount, 0)
+                        record('db', started)
+
+        _cursor_classes[base] = InstrumentedCursor
+    return _cursor_classes[base]
+
+
+def connection_kwargs() -> Dict[str, Any]:
+    if not ENABLED:
+        return {}
+    import psycopg2.extensions
+
+    class InstrumentedConnection(psycopg2.extensions.connection):
+        def cursor(self, *args: Any, **kwargs: Any) -> Any:
+            base = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+            kwargs['cursor_factory'] = _instrumented_cursor(base)
+            return super().cursor(*args, **kwargs)
+
+    return {'connection_factory': InstrumentedConnection}
+
+
+def _server_timing(stats: Stats, total: float) -> str:
+    parts = [f'{name};dur={duration:.1f}' for name, duration in stats.timings.items()]
+    parts.append(f'total;dur={total:.1f};desc="{stats.queries} queries"')
+    return ', '.join(parts)
+
+
+def instrumented(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]]) -> Callable[[Dict[str, Any], Any], Dict[str, Any]]:
+    if not ENABLED:
+        return handler
+
+    @wraps(handler)
+    def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        stats = Stats()
+        _local.stats = stats
+        started = time.perf_counter()
+        response: Optional[Dict[str, Any]] = None
+        try:
+            response = handler(event, context)
+            return response
+        finally:
+            total = (time.perf_counter() - started) * 1000
+            _local.stats = None
+            status = response.get('statusCode') if response else 500
+            if response is not None:
+                response['headers'] = {
+                    **(response.get('headers') or {}),
+                    'Server-Timing': _server_timing(stats, total),
+                    'Timing-Allow-Origin': '*'
+                }
+            log = {
+                'event': 'invocation',
+                'function': getattr(context, 'function_name', None),
+                'request_id': getattr(context, 'request_id', None),
+                'method': event.get('httpMethod'),
+                'status': status,
+                'total_ms': round(total, 2),
+                'queries': stats.queries,
+                'rows': stats.rows,
+                **{f'{name}_ms': round(duration, 2) for name, duration in stats.timings.items()}
+            }
+            if response is None:
+                log['error'] = 'unhandled exception'
+            elif status >= 500:
+                try:
+                    log['error'] = json.loads(response.get('body') or '{}').get('error')
+                except (ValueError, AttributeError):
+                    pass
+            print(json.dumps(log, ensure_ascii=False))
+
+    return wrapper
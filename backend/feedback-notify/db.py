@@ -0,0 +1,154 @@
+'''
+Business: Пул соединений с Postgres, общий для всех вызовов функции в тёплом контейнере
+Args: DATABASE_URL, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_CHECK_AFTER, DB_PREPARED_STATEMENTS из окружения
+Returns: get_connection() - контекстный менеджер, выдающий проверенное соединение из пула;
+         execute_prepared() - выполнение горячих запросов через PREPARE/EXECUTE на тёплом соединении.
+         psycopg2 импортируется при первом обращении к пулу, чтобы preflight и отказы валидации не платили за загрузку драйвера
+'''
+
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Iterator, Optional, Sequence, Set
+
+import instrument
+
+if TYPE_CHECKING:
+    from psycopg2 import pool
+
+POOL_MIN = int(os.environ.get('DB_POOL_MIN', '1'))
+POOL_MAX = int(os.environ.get('DB_POOL_MAX', '4'))
+# Соединения, простаивавшие дольше этого числа секунд, проверяются SELECT 1 перед выдачей
+CHECK_AFTER = float(os.environ.get('DB_POOL_CHECK_AFTER', '30'))
+# Серверные prepared statements живут в сессии, поэтому выключены по умолчанию (несовместимы с pgbouncer в режиме transaction)
+PREPARED_STATEMENTS = os.environ.get('DB_PREPARED_STATEMENTS', '0') == '1'
+
+_pool: Optional['pool.ThreadedConnectionPool'] = None
+_pool_lock = threading.Lock()
+# Ключ - само соединение, а не id(conn): пул закрывает лишние соединения при возврате,
+# и id закрытого мог бы достаться новому соединению вместе с чужим списком подготовленных запросов
+_last_used: 'weakref.WeakKeyDictionary[Any, float]' = weakref.WeakKeyDictionary()
+_prepared: 'weakref.WeakKeyDictionary[Any, Set[str]]' = weakref.WeakKeyDictionary()
+
+
+def _get_pool() -> 'pool.ThreadedConnectionPool':
+    global _pool
+    if _pool is None or _pool.closed:
+        with _pool_lock:
+            if _pool is None or _pool.closed:
+                from psycopg2 import pool
+                _pool = pool.ThreadedConnectionPool(
+                    POOL_MIN, POOL_MAX, os.environ.get('DATABASE_URL'), **instrument.connection_kwargs()
+                )
+    return _pool
+
+
+def _forget(conn: Any) -> None:
+    _last_used.pop(conn, None)
+    _prepared.pop(conn, None)
+
+
+def _is_healthy(conn: Any) -> bool:
+    import psycopg2
+    
+    if conn.closed:
+        return False
+    # Соединения без отметки пул только что открыл: все возвращённые в пул отмечаются в _release
+    last_used = _last_used.get(conn)
+    if last_used is None or time.monotonic() - last_used < CHECK_AFTER:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SELECT 1')
+        conn.rollback()
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+
+def _acquire() -> Any:
+    import psycopg2
+    
+    db_pool = _get_pool()
+    # Пул может отдать соединение, оборванное сервером, пока контейнер спал
+    for _ in range(POOL_MAX + 1):
+        conn = db_pool.getconn()
+        if _is_healthy(conn):
+            return conn
+        _forget(conn)
+        db_pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError('Could not obtain a healthy database connection')
+
+
+def _release(conn: Any, broken: bool = False) -> None:
+    db_pool = _get_pool()
+    if broken or conn.closed:
+        _forget(conn)
+        db_pool.putconn(conn, close=True)
+        return
+    _last_used[conn] = time.monotonic()
+    db_pool.putconn(conn)
+
+
+@contextmanager
+def get_connection() -> Iterator[Any]:
+    import psycopg2
+    
+    started = time.perf_counter()
+    conn = _acquire()
+    if instrument.ENABLED:
+        instrument.record('connect', started)
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        _release(conn, broken)
+
+
+def _to_positional(statement: str) -> str:
+    parts = statement.split('%s')
+    return parts[0] + ''.join(f'${idx}{part}' for idx, part in enumerate(parts[1:], start=1))
+
+
+def _execute(cur: Any, name: str, args: Sequence[Any]) -> None:
+    if args:
+        cur.execute(f'EXECUTE {name} (' + ', '.join(['%s'] * len(args)) + ')', args)
+    else:
+        cur.execute(f'EXECUTE {name}')
+
+
+def execute_prepared(cur: Any, name: str, statement: str, args: Sequence[Any] = ()) -> None:
+    if not PREPARED_STATEMENTS:
+        cur.execute(statement, args or None)
+        return
+    
+    from psycopg2 import errors, extensions
+    
+    conn = cur.connection
+    # Транзакцию можно откатить без потерь, только если в ней ещё ничего не выполнялось
+    idle = conn.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE
+    prepared = _prepared.setdefault(conn, set())
+    if name not in prepared:
+        cur.execute(f'PREPARE {name} AS {_to_positional(statement)}')
+        prepared.add(name)
+    
+    try:
+        _execute(cur, name, args)
+    except errors.InvalidSqlStatementName:
+        # Сессию сбросили на сервере (DISCARD ALL, pgbouncer): запомненные имена больше не действуют
+        prepared.clear()
+        if not idle:
+            raise
+        conn.rollback()
+        cur.execute(f'PREPARE {name} AS {_to_positional(statement)}')
+        prepared.add(name)
+        _execute(cur, name, args)
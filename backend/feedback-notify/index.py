@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
+
+from db import get_connection
+from instrument import instrumented
+
+# smtplib and the email package are only needed when a batch is actually sent
+if TYPE_CHECKING:
+    from email.message import EmailMessage
+
+SMTP_HOST = os.environ.get('SMTP_HOST', '')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
+SMTP_USER = os.environ.get('SMTP_USER', '')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', '1') == '1'
+SMTP_TIMEOUT = float(os.environ.get('SMTP_TIMEOUT', '10'))
+NOTIFY_FROM = os.environ.get('NOTIFY_FROM', SMTP_USER)
+NOTIFY_TO = [address.strip() for address in os.environ.get('NOTIFY_TO', '').split(',') if address.strip()]
+BATCH_SIZE = int(os.environ.get('NOTIFY_BATCH_SIZE', '20'))
+# Upper bound on concurrent SMTP sessions, independent of the batch size
+WORKERS = int(os.environ.get('NOTIFY_WORKERS', '4'))
+MAX_ATTEMPTS = int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '5'))
+MAX_BATCHES = int(os.environ.get('NOTIFY_MAX_BATCHES', '10'))
+
+# SKIP LOCKED lets several workers drain the outbox without handing out the same row twice
+CLAIM_BATCH = '''
+    SELECT o.id, o.attempts, m.name, m.email, m.message, m.created_at
+    FROM t_p40618121_yenisei_sport_hall_1.feedback_outbox o
+    JOIN t_p40618121_yenisei_sport_hall_1.feedback_messages m ON m.id = o.message_id
+    WHERE o.delivered_at IS NULL AND o.available_at <= CURRENT_TIMESTAMP AND o.attempts < %s
+    ORDER BY o.available_at, o.id
+    LIMIT %s
+    FOR UPDATE OF o SKIP LOCKED
+'''
+
+PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Max-Age': '86400'
+}
+JSON_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+def smtp_configured() -> bool:
+    return bool(SMTP_HOST and NOTIFY_FROM and NOTIFY_TO)
+
+def header_value(value: str) -> str:
+    '''Collapses CR/LF and other whitespace runs: form input must not be able to inject header lines'''
+    return ' '.join(str(value).split())
+
+def build_message(name: str, email: str, message: str, created_at: Any) -> 'EmailMessage':
+    from email.message import EmailMessage
+    notification = EmailMessage()
+    notification['Subject'] = f'Новое сообщение с сайта от {header_value(name)}'
+    notification['From'] = NOTIFY_FROM
+    notification['To'] = ', '.join(NOTIFY_TO)
+    notification['Reply-To'] = header_value(email)
+    notification.set_content(f'Имя: {name}\nEmail: {email}\nДата: {created_at:%d.%m.%Y %H:%M}\n\n{message}')
+    return notification
+
+def send_notification(notification: 'EmailMessage') -> Optional[str]:
+    import smtplib
+    try:
+        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT) as smtp:
+            if SMTP_STARTTLS:
+                smtp.starttls()
+            if SMTP_USER:
+                smtp.login(SMTP_USER, SMTP_PASSWORD)
+            smtp.send_message(notification)
+        return None
+    except (smtplib.SMTPException, OSError) as e:
+        return f'{type(e).__name__}: {e}'
+
+def deliver(row: Tuple[Any, ...]) -> Optional[str]:
+    '''
+    Builds and sends the notification for one claimed row; any error becomes that row's failed attempt
+    so a single bad message cannot roll back the batch and block the outbox
+    '''
+    _, _, name, email, message, created_at = row
+    try:
+        return send_notification(build_message(name, email, message, created_at))
+    except Exception as e:
+        return f'{type(e).__name__}: {e}'
+
+def drain_batch(executor: ThreadPoolExecutor) -> Tuple[int, int]:
+    '''
+    Claims one batch of pending outbox rows, sends them concurrently and records the outcome
+    in the same transaction that holds the row locks
+    '''
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(CLAIM_BATCH, (MAX_ATTEMPTS, BATCH_SIZE))
+        rows = cur.fetchall()
+        if not rows:
+            conn.rollback()
+            cur.close()
+            return 0, 0
+
+        errors: List[Optional[str]] = list(executor.map(deliver, rows))
+
+        delivered_ids = [row[0] for row, error in zip(rows, errors) if error is None]
+        failed = [(row[0], error) for row, error in zip(rows, errors) if error is not None]
+
+        if delivered_ids:
+            cur.execute(
+                '''
+                UPDATE t_p40618121_yenisei_sport_hall_1.feedback_outbox
+                SET delivered_at = CURRENT_TIMESTAMP, attempts = attempts + 1, last_error = NULL
+                WHERE id = ANY(%s)
+                ''',
+                (delivered_ids,)
+            )
+        if failed:
+            # Exponential backoff: 30 s, 1 min, 2 min, ... capped at an hour
+            cur.execute(
+                '''
+                UPDATE t_p40618121_yenisei_sport_hall_1.feedback_outbox o
+                SET attempts = o.attempts + 1,
+                    last_error = f.error,
+                    available_at = CURRENT_TIMESTAMP + make_interval(secs => LEAST(3600, 30 * power(2, o.attempts)))
+                FROM unnest(%s::bigint[], %s::text[]) AS f(id, error)
+                WHERE o.id = f.id
+                ''',
+                ([outbox_id for outbox_id, _ in failed], [error for _, error in failed])
+            )
+        conn.commit()
+        cur.close()
+
+    return len(delivered_ids), len(failed)
+
+def drain_outbox(max_batches: int = MAX_BATCHES) -> Dict[str, int]:
+    delivered = failed = batches = 0
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        while batches < max_batches:
+            batch_delivered, batch_failed = drain_batch(executor)
+            if batch_delivered == batch_failed == 0:
+                break
+            delivered += batch_delivered
+            failed += batch_failed
+            batches += 1
+            if batch_delivered + batch_failed < BATCH_SIZE:
+                break
+    return {'delivered': delivered, 'failed': failed, 'batches': batches}
+
+def fetch_outbox_stats() -> Dict[str, int]:
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            '''
+            SELECT
+                COUNT(*) FILTER (WHERE delivered_at IS NULL AND attempts < %s),
+                COUNT(*) FILTER (WHERE delivered_at IS NULL AND attempts >= %s)
+            FROM t_p40618121_yenisei_sport_hall_1.feedback_outbox
+            ''',
+            (MAX_ATTEMPTS, MAX_ATTEMPTS)
+        )
+        pending, dead = cur.fetchone()
+        cur.close()
+    return {'pending': pending, 'dead': dead}
+
+@instrumented
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Deliver email notifications about new feedback messages from the outbox
+    Args: event with httpMethod (GET - outbox stats, POST - drain pending notifications, e.g. from a scheduler)
+          context with request_id
+    Returns: HTTP response with outbox stats or delivered/failed counts
+    '''
+    method: str = event.get('httpMethod', 'POST')
+
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': PREFLIGHT_HEADERS,
+            'body': ''
+        }
+
+    if method not in ('GET', 'POST'):
+        return {
+            'statusCode': 405,
+            'headers': JSON_HEADERS,
+            'body': json.dumps({'error': 'Method not allowed'})
+        }
+
+    if method == 'POST' and not smtp_configured():
+        return {
+            'statusCode': 500,
+            'headers': JSON_HEADERS,
+            'body': json.dumps({'error': 'SMTP not configured'})
+        }
+
+    try:
+        result = fetch_outbox_stats() if method == 'GET' else drain_outbox()
+        return {
+            'statusCode': 200,
+            'headers': JSON_HEADERS,
+            'isBase64Encoded': False,
+            'body': json.dumps(result)
+        }
+    except Exception as e:
+        print(f'Outbox error: {str(e)}')
+        return {
+            'statusCode': 500,
+            'headers': JSON_HEADERS,
+            'body': json.dumps({'error': f'Database error: {str(e)}'})
+        }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Drain the feedback notification outbox')
+    parser.add_argument('--interval', type=float, default=0, help='keep draining every N seconds')
+    args = parser.parse_args()
+
+    if not smtp_configured():
+        raise SystemExit('SMTP_HOST, NOTIFY_FROM and NOTIFY_TO must be set')
+
+    while True:
+        print(json.dumps(drain_outbox()))
+        if args.interval <= 0:
+            break
+        time.sleep(args.interval)
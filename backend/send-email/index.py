@@ -1,36 +1,91 @@
 import json
+import math
 import os
-import psycopg2
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence
 
+from db import get_connection
+from instrument import instrumented
+from throttle import (
+    BATCH_MAX_WAIT, BATCH_SIZE, DUPLICATE_WINDOW, EMAIL_BURST, EMAIL_PER_HOUR, IP_BURST, IP_PER_HOUR,
+    DuplicateFilter, SubmissionBuffer, TokenBucketLimiter
+)
+
+# The NOT EXISTS guard also catches duplicates that reached another warm instance;
+# DUPLICATE_WINDOW is an int from the environment, so it is safe to inline.
+# The outbox row is written by the same statement, so a notification exists iff the message does
+INSERT_MESSAGES = f'''
+    WITH inserted AS (
+        INSERT INTO t_p40618121_yenisei_sport_hall_1.feedback_messages (name, email, message)
+        SELECT v.name, v.email, v.message
+        FROM (VALUES %s) AS v(name, email, message)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM t_p40618121_yenisei_sport_hall_1.feedback_messages f
+            WHERE f.email = v.email AND f.message = v.message
+              AND f.created_at > CURRENT_TIMESTAMP - make_interval(secs => {DUPLICATE_WINDOW})
+        )
+        RETURNING id
+    )
+    INSERT INTO t_p40618121_yenisei_sport_hall_1.feedback_outbox (message_id)
+    SELECT id FROM inserted
+'''
+
+ip_limiter = TokenBucketLimiter(IP_BURST, IP_PER_HOUR)
+email_limiter = TokenBucketLimiter(EMAIL_BURST, EMAIL_PER_HOUR)
+duplicate_filter = DuplicateFilter(DUPLICATE_WINDOW)
+
+PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Max-Age': '86400'
+}
+JSON_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+def insert_messages(rows: List[Sequence[Any]]) -> int:
+    from psycopg2.extras import execute_values
+    with get_connection() as conn:
+        cur = conn.cursor()
+        execute_values(cur, INSERT_MESSAGES, rows, page_size=max(len(rows), 1))
+        inserted = cur.rowcount
+        conn.commit()
+        cur.close()
+    return inserted
+
+submission_buffer = SubmissionBuffer(BATCH_SIZE, BATCH_MAX_WAIT, insert_messages) if BATCH_SIZE > 1 else None
+
+def get_client_ip(event: Dict[str, Any]) -> Optional[str]:
+    identity = (event.get('requestContext') or {}).get('identity') or {}
+    if identity.get('sourceIp'):
+        return identity['sourceIp']
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == 'x-forwarded-for' and value:
+            return value.split(',')[0].strip()
+    return None
+
+@instrumented
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
-    Business: Save contact form messages to database for admin panel
-    Args: event with httpMethod, body containing name, email, message
+    Business: Save contact form messages to database for admin panel, throttled per IP and email
+    Args: event with httpMethod, body containing name, email, message, requestContext with source IP
           context with request_id
-    Returns: HTTP response with success/error status
+    Returns: HTTP response with success/error status; 429 with Retry-After when rate limited
     '''
     method: str = event.get('httpMethod', 'GET')
     
     if method == 'OPTIONS':
         return {
             'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Max-Age': '86400'
-            },
+            'headers': PREFLIGHT_HEADERS,
             'body': ''
         }
     
     if method != 'POST':
         return {
             'statusCode': 405,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': JSON_HEADERS,
             'body': json.dumps({'error': 'Method not allowed'})
         }
     
@@ -46,10 +101,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     if not name or not email:
         return {
             'statusCode': 400,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': JSON_HEADERS,
             'body': json.dumps({'error': 'Name and email are required'})
         }
     
@@ -57,40 +109,54 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     if not db_url:
         return {
             'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': JSON_HEADERS,
             'body': json.dumps({'error': 'Database not configured'})
         }
     
+    client_ip = get_client_ip(event)
+    email_key = email.strip().lower()
+    retry_after = max(
+        ip_limiter.acquire(client_ip) if client_ip else 0.0,
+        email_limiter.acquire(email_key)
+    )
+    if retry_after > 0:
+        return {
+            'statusCode': 429,
+            'headers': {**JSON_HEADERS, 'Retry-After': str(min(math.ceil(retry_after), 86400))},
+            'body': json.dumps({'error': 'Too many messages, please try again later'})
+        }
+    
+    if duplicate_filter.seen(email, message):
+        return {
+            'statusCode': 200,
+            'headers': JSON_HEADERS,
+            'isBase64Encoded': False,
+            'body': json.dumps({'success': True, 'message': 'Message already received', 'duplicate': True})
+        }
+    
     try:
-        conn = psycopg2.connect(db_url)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO t_p40618121_yenisei_sport_hall_1.feedback_messages (name, email, message) VALUES (%s, %s, %s)",
-            (name, email, message)
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
+        if submission_buffer is not None:
+            submission_buffer.add((name, email, message))
+            response_body = {'success': True, 'message': 'Message queued', 'queued': True}
+        else:
+            insert_messages([(name, email, message)])
+            response_body = {'success': True, 'message': 'Message saved successfully'}
         
         return {
             'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': JSON_HEADERS,
             'isBase64Encoded': False,
-            'body': json.dumps({'success': True, 'message': 'Message saved successfully'})
+            'body': json.dumps(response_body)
         }
     except Exception as e:
         print(f'DB error: {str(e)}')
+        # Nothing was stored, so the client's retry must hit neither the duplicate filter nor the rate limit
+        duplicate_filter.forget(email, message)
+        if client_ip:
+            ip_limiter.refund(client_ip)
+        email_limiter.refund(email_key)
         return {
             'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': JSON_HEADERS,
             'body': json.dumps({'error': f'Database error: {str(e)}'})
         }
\ No newline at end of file
@@ -0,0 +1,151 @@
+'''
+Business: Защита базы от всплесков отправок формы обратной связи - лимиты token bucket, подавление дублей, пакетная запись
+Args: CONTACT_RATE_IP_BURST, CONTACT_RATE_IP_PER_HOUR, CONTACT_RATE_EMAIL_BURST, CONTACT_RATE_EMAIL_PER_HOUR,
+      CONTACT_DUPLICATE_WINDOW, CONTACT_BATCH_SIZE, CONTACT_BATCH_MAX_WAIT из окружения
+Returns: TokenBucketLimiter.acquire() - 0 или сколько секунд ждать, refund() - вернуть жетон;
+         DuplicateFilter.seen() - было ли такое сообщение, forget() - снять отметку;
+         SubmissionBuffer.add() - копит строки и сбрасывает их пачкой
+'''
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+IP_BURST = int(os.environ.get('CONTACT_RATE_IP_BURST', '5'))
+IP_PER_HOUR = float(os.environ.get('CONTACT_RATE_IP_PER_HOUR', '20'))
+EMAIL_BURST = int(os.environ.get('CONTACT_RATE_EMAIL_BURST', '3'))
+EMAIL_PER_HOUR = float(os.environ.get('CONTACT_RATE_EMAIL_PER_HOUR', '10'))
+# Одинаковое сообщение с того же адреса в пределах окна (секунды) повторно не сохраняется
+DUPLICATE_WINDOW = int(os.environ.get('CONTACT_DUPLICATE_WINDOW', '600'))
+# 0 - каждая отправка пишется сразу; иначе строки копятся и вставляются одной командой
+BATCH_SIZE = int(os.environ.get('CONTACT_BATCH_SIZE', '0'))
+BATCH_MAX_WAIT = float(os.environ.get('CONTACT_BATCH_MAX_WAIT', '2'))
+# Ограничение числа отслеживаемых ключей, чтобы перебор IP не раздувал память экземпляра
+MAX_KEYS = 10000
+
+
+class TokenBucketLimiter:
+    '''
+    Token bucket на ключ в памяти тёплого экземпляра: burst запросов сразу, дальше rate_per_hour
+    '''
+    def __init__(self, burst: int, rate_per_hour: float, clock: Callable[[], float] = time.monotonic):
+        self.burst = burst
+        self.rate = rate_per_hour / 3600
+        self._clock = clock
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def acquire(self, key: str) -> float:
+        if self.burst <= 0:
+            return 0.0
+        now = self._clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated_at) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                retry_after = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (1 - tokens) / self.rate if self.rate > 0 else float('inf')
+            while len(self._buckets) > MAX_KEYS:
+                self._buckets.popitem(last=False)
+        return retry_after
+    
+    def refund(self, key: str) -> None:
+        '''Возвращает жетон, если отправка не состоялась по вине сервера'''
+        if self.burst <= 0:
+            return
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated_at = self._buckets[key]
+                self._buckets[key] = (min(float(self.burst), tokens + 1), updated_at)
+
+
+class DuplicateFilter:
+    def __init__(self, window: float, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self._clock = clock
+        self._seen: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def fingerprint(email: str, message: str) -> str:
+        normalized = ' '.join(message.split()).lower()
+        return hashlib.sha1(f'{email.strip().lower()}\n{normalized}'.encode('utf-8')).hexdigest()
+    
+    def seen(self, email: str, message: str) -> bool:
+        if self.window <= 0:
+            return False
+        key = self.fingerprint(email, message)
+        now = self._clock()
+        with self._lock:
+            while self._seen:
+                oldest_key, seen_at = next(iter(self._seen.items()))
+                if now - seen_at < self.window and len(self._seen) <= MAX_KEYS:
+                    break
+                del self._seen[oldest_key]
+            if key in self._seen:
+                return True
+            self._seen[key] = now
+        return False
+    
+    def forget(self, email: str, message: str) -> None:
+        '''Снимает отметку, чтобы повтор после неудачной записи не был принят за дубль'''
+        if self.window <= 0:
+            return
+        with self._lock:
+            self._seen.pop(self.fingerprint(email, message), None)
+
+
+class SubmissionBuffer:
+    '''
+    Копит строки до batch_size или max_wait секунд и передаёт их flush_rows одной пачкой.
+    Буфер живёт в памяти экземпляра: при заморозке контейнера несброшенные строки ждут следующего вызова.
+    Если запись не удалась, строки остаются в буфере и таймер перезапускается для повторной попытки
+    '''
+    def __init__(self, batch_size: int, max_wait: float, flush_rows: Callable[[List[Sequence[Any]]], None]):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._flush_rows = flush_rows
+        self._rows: List[Sequence[Any]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+    
+    def _schedule(self) -> None:
+        # Вызывается под self._lock
+        if self._timer is None:
+            self._timer = threading.Timer(self.max_wait, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def add(self, row: Sequence[Any]) -> None:
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.batch_size
+            if not full:
+                self._schedule()
+        if full:
+            self.flush()
+    
+    def flush(self) -> int:
+        '''Число записанных строк; при сбое базы 0 - строки остаются в буфере до следующей попытки'''
+        with self._lock:
+            rows, self._rows = self._rows, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not rows:
+            return 0
+        try:
+            self._flush_rows(rows)
+        except Exception as e:
+            print(f'Batch flush failed, {len(rows)} rows kept for retry: {str(e)}')
+            with self._lock:
+                self._rows = rows + self._rows
+                self._schedule()
+            return 0
+        return len(rows)
@@ -0,0 +1,121 @@
+'''
+Business: Резервное хранилище фото в Postgres, адресуемое по SHA-256, на случай недоступности CDN
+Args: cur - курсор psycopg2, data - байты файла; при запуске как скрипт - DATABASE_URL и --batch-size
+Returns: хэш сохранённого файла и ссылку на него; индекс уже загруженных в CDN файлов по хэшу;
+         скрипт переносит data URL из gallery_photos в хранилище
+'''
+
+import argparse
+import binascii
+import hashlib
+import os
+import re
+from typing import Any, Dict, Optional, Tuple
+
+MEDIA_URL = os.environ.get('MEDIA_URL', 'https://functions.poehali.dev/b09c83ad-8ea7-4412-bd92-a45a3a2d32cd')
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+DATA_URL_RE = re.compile(r'^data:([^;,]+)?(;base64)?,', re.IGNORECASE)
+# Типы, которые хранилище готово отдавать браузеру как есть
+IMAGE_CONTENT_TYPES = frozenset({'image/jpeg', 'image/png', 'image/webp', 'image/gif', 'image/bmp', 'image/tiff'})
+
+
+def blob_url(digest: str) -> str:
+    return f'{MEDIA_URL}?hash={digest}'
+
+
+def store_blob(cur: Any, data: bytes, content_type: str) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    cur.execute(
+        """
+        INSERT INTO media_blobs (sha256, content_type, size, data)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (sha256) DO NOTHING
+        """,
+        (digest, content_type, len(data), data)
+    )
+    return digest
+
+
+def load_blob(cur: Any, digest: str) -> Optional[Tuple[str, bytes]]:
+    cur.execute('SELECT content_type, data FROM media_blobs WHERE sha256 = %s', (digest,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return row[0], bytes(row[1])
+
+
+def find_upload(cur: Any, digest: str) -> Optional[Dict[str, Any]]:
+    cur.execute('SELECT result FROM photo_upload_index WHERE sha256 = %s', (digest,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def remember_upload(cur: Any, digest: str, result: Dict[str, Any]) -> None:
+    from psycopg2.extras import Json
+    cur.execute(
+        """
+        INSERT INTO photo_upload_index (sha256, url, result)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (sha256) DO NOTHING
+        """,
+        (digest, result['url'], Json(result))
+    )
+
+
+def parse_data_url(url: str) -> Optional[Tuple[str, bytes]]:
+    match = DATA_URL_RE.match(url)
+    if not match or not match.group(2):
+        return None
+    content_type = (match.group(1) or '').lower()
+    if content_type not in IMAGE_CONTENT_TYPES:
+        return None
+    return content_type, binascii.a2b_base64(url[match.end():])
+
+
+def migrate_gallery_data_urls(conn: Any, batch_size: int = 20) -> int:
+    '''
+    Переносит фото, сохранённые в gallery_photos.url как data URL, в media_blobs
+    и заменяет url ссылкой на хранилище. Каждая пачка коммитится отдельно
+    '''
+    migrated = 0
+    last_id = 0
+    cur = conn.cursor()
+    while True:
+        cur.execute(
+            """
+            SELECT id, url FROM gallery_photos
+            WHERE id > %s AND url LIKE 'data:%%'
+            ORDER BY id
+            LIMIT %s
+            """,
+            (last_id, batch_size)
+        )
+        rows = cur.fetchall()
+        if not rows:
+            break
+        for photo_id, url in rows:
+            last_id = photo_id
+            parsed = parse_data_url(url)
+            if parsed is None:
+                continue
+            content_type, data = parsed
+            digest = store_blob(cur, data, content_type)
+            cur.execute(
+                'UPDATE gallery_photos SET url = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s',
+                (blob_url(digest), photo_id)
+            )
+            migrated += 1
+        conn.commit()
+    cur.close()
+    return migrated
+
+
+if __name__ == '__main__':
+    from db import get_connection
+
+    parser = argparse.ArgumentParser(description='Move data-URL gallery photos into media_blobs')
+    parser.add_argument('--batch-size', type=int, default=20)
+    args = parser.parse_args()
+
+    with get_connection() as connection:
+        print(f'Migrated {migrate_gallery_data_urls(connection, args.batch_size)} photos')
@@ -0,0 +1,227 @@
+'''
+Business: Клиент CDN для upload-photo - общая keep-alive сессия, повторы с экспоненциальной задержкой, предохранитель и метрики
+Args: CDN_UPLOAD_URL, CDN_TIMEOUT, CDN_MAX_ATTEMPTS, CDN_BACKOFF_BASE, CDN_BACKOFF_MAX,
+      CDN_BREAKER_THRESHOLD, CDN_BREAKER_RESET из окружения
+Returns: upload_to_cdn() - URL загруженного файла или None; get_metrics() - счётчики попыток и задержек.
+         requests импортируется и сессия создаётся при первой загрузке, а не при импорте модуля
+'''
+
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+CDN_UPLOAD_URL = os.environ.get('CDN_UPLOAD_URL', 'https://cdn-api.poehali.dev/upload')
+TIMEOUT = float(os.environ.get('CDN_TIMEOUT', '10'))
+MAX_ATTEMPTS = int(os.environ.get('CDN_MAX_ATTEMPTS', '3'))
+BACKOFF_BASE = float(os.environ.get('CDN_BACKOFF_BASE', '0.2'))
+BACKOFF_MAX = float(os.environ.get('CDN_BACKOFF_MAX', '2'))
+BREAKER_THRESHOLD = int(os.environ.get('CDN_BREAKER_THRESHOLD', '5'))
+BREAKER_RESET = float(os.environ.get('CDN_BREAKER_RESET', '30'))
+# Столько же соединений держит пул, сколько вариантов фото загружается параллельно
+POOL_SIZE = 4
+
+
+class MultipartBody:
+    '''
+    Тело multipart/form-data из одного файла, читаемое по кускам прямо из буфера картинки:
+    requests отправляет его потоком, не склеивая заголовок, байты файла и хвост в новую строку
+    '''
+    def __init__(self, field: str, filename: str, content_type: str, data: bytes):
+        self.boundary = uuid.uuid4().hex
+        safe_filename = filename.replace('"', '').replace('\r', '').replace('\n', '')
+        head = (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field}"; filename="{safe_filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        ).encode('utf-8')
+        tail = f'\r\n--{self.boundary}--\r\n'.encode('ascii')
+        self._parts: List[memoryview] = [memoryview(head), memoryview(data).cast('B'), memoryview(tail)]
+        self._length = sum(part.nbytes for part in self._parts)
+        self._part_index = 0
+        self._offset = 0
+    
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._length
+        chunks = []
+        while size > 0 and self._part_index < len(self._parts):
+            part = self._parts[self._part_index]
+            chunk = part[self._offset:self._offset + size]
+            chunks.append(chunk)
+            size -= chunk.nbytes
+            self._offset += chunk.nbytes
+            if self._offset >= part.nbytes:
+                self._part_index += 1
+                self._offset = 0
+        return b''.join(chunks)
+
+
+class CircuitBreaker:
+    '''
+    После BREAKER_THRESHOLD подряд неудачных загрузок перестаёт обращаться к CDN на BREAKER_RESET секунд,
+    затем пропускает одну пробную загрузку: успех закрывает предохранитель, неудача снова размыкает
+    '''
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_after or self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+_session: Optional[Any] = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> Any:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET)
+
+_metrics_lock = threading.Lock()
+_metrics: Dict[str, float] = {
+    'uploads': 0,
+    'attempts': 0,
+    'retries': 0,
+    'successes': 0,
+    'failures': 0,
+    'short_circuited': 0,
+    'latency_ms_total': 0.0
+}
+
+
+def _count(**increments: float) -> None:
+    with _metrics_lock:
+        for key, value in increments.items():
+            _metrics[key] += value
+
+
+def get_metrics() -> Dict[str, float]:
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def backoff_delay(attempt: int) -> float:
+    # Full jitter: случайная пауза от нуля до экспоненциально растущего потолка
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def upload_to_cdn(cdn_api_key: str, project_id: str, filename: str, content_type: str, data: bytes) -> Optional[str]:
+    if not breaker.allow():
+        _count(uploads=1, short_circuited=1)
+        return None
+    
+    import requests
+    session = _get_session()
+    started = time.perf_counter()
+    attempts = 0
+    url = None
+    status: Optional[int] = None
+    cdn_reachable = False
+    
+    # Исход загрузки записывается в finally: иначе непредвиденная ошибка во время пробной загрузки
+    # оставила бы предохранитель полуоткрытым навсегда
+    try:
+        while attempts < MAX_ATTEMPTS:
+            if attempts:
+                time.sleep(backoff_delay(attempts - 1))
+            attempts += 1
+            status = None
+            # Тело пересоздаётся на каждую попытку: это лишь обёртка над тем же буфером, без копирования байтов
+            body = MultipartBody('file', filename, content_type, data)
+            try:
+                response = session.post(
+                    CDN_UPLOAD_URL,
+                    headers={
+                        'Authorization': f'Bearer {cdn_api_key}',
+                        'X-Project-ID': project_id,
+                        'Content-Type': body.content_type,
+                        'Content-Length': str(len(body))
+                    },
+                    data=body,
+                    timeout=TIMEOUT
+                )
+                status = response.status_code
+                payload = response.json() if response.ok else None
+                if response.ok and not isinstance(payload, dict):
+                    raise ValueError('CDN response is not a JSON object')
+            except (requests.RequestException, ValueError):
+                # Таймаут, обрыв, зацикленные редиректы или ответ 200 не в JSON - попытка не удалась
+                continue
+            
+            if response.ok:
+                url = payload.get('url')
+                cdn_reachable = True
+                break
+            if status < 500 and status != 429:
+                # 4xx не исправится повтором, и CDN при этом доступен
+                cdn_reachable = True
+                break
+    finally:
+        latency_ms = (time.perf_counter() - started) * 1000
+        if cdn_reachable:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        _count(
+            uploads=1,
+            attempts=attempts,
+            retries=max(attempts - 1, 0),
+            successes=1 if url else 0,
+            failures=0 if url else 1,
+            latency_ms_total=latency_ms
+        )
+        print(json.dumps({
+            'event': 'cdn_upload',
+            'filename': filename,
+            'attempts': attempts,
+            'status': status,
+            'success': bool(url),
+            'latency_ms': round(latency_ms, 1)
+        }))
+    return url
@@ -0,0 +1,84 @@
+'''
+Business: Подготовка фото для галереи - определение реального формата, удаление EXIF, варианты WebP/JPEG и плейсхолдер
+Args: data - байты загруженного изображения
+Returns: dict с форматом, размерами, списком вариантов (байты + ширина + MIME) и крошечным плейсхолдером в data URL
+'''
+
+import base64
+import io
+from typing import Any, Dict, List
+
+from PIL import Image, ImageOps
+
+VARIANT_WIDTHS = (320, 640, 1280)
+MAX_WIDTH = 2048
+PLACEHOLDER_WIDTH = 16
+
+# format -> (кодек Pillow, MIME, параметры сохранения)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True})
+}
+
+MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+    'GIF': 'image/gif',
+    'BMP': 'image/bmp',
+    'TIFF': 'image/tiff'
+}
+
+
+def target_widths(width: int) -> List[int]:
+    largest = min(width, MAX_WIDTH)
+    return [w for w in VARIANT_WIDTHS if w < largest] + [largest]
+
+
+def resize_to_width(image: Image.Image, width: int) -> Image.Image:
+    if image.width == width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def encode(image: Image.Image, fmt: str) -> bytes:
+    codec, _, options = VARIANT_FORMATS[fmt]
+    if codec == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    # EXIF не передаётся в save, поэтому метаданные (включая геолокацию) в варианты не попадают
+    image.save(buffer, codec, **options)
+    return buffer.getvalue()
+
+
+def process_image(data: bytes) -> Dict[str, Any]:
+    with Image.open(io.BytesIO(data)) as source:
+        source_format = source.format
+        # Поворот по EXIF Orientation применяем к пикселям, раз сами EXIF-данные отбрасываются
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    variants = []
+    for width in target_widths(image.width):
+        resized = resize_to_width(image, width)
+        for fmt, (_, content_type, _) in VARIANT_FORMATS.items():
+            variants.append({
+                'format': fmt,
+                'width': width,
+                'height': resized.height,
+                'content_type': content_type,
+                'data': encode(resized, fmt)
+            })
+
+    placeholder = encode(resize_to_width(image, min(PLACEHOLDER_WIDTH, image.width)), 'jpeg')
+
+    return {
+        'format': (source_format or '').lower(),
+        'content_type': MIME_TYPES.get(source_format, 'application/octet-stream'),
+        'width': image.width,
+        'height': image.height,
+        'variants': variants,
+        'placeholder': 'data:image/jpeg;base64,' + base64.b64encode(placeholder).decode('ascii')
+    }
@@ -1,136 +1,282 @@
 '''
 Business: Загрузка фото в CDN и возврат постоянной ссылки
-Args: event - dict с httpMethod, body (base64 картинка), headers
+Args: event - dict с httpMethod, body (JSON с base64 картинкой или сырые байты с isBase64Encoded), headers
       context - object с request_id, function_name
-Returns: HTTP response dict с постоянной URL-ссылкой на фото
+Returns: HTTP response dict с постоянной URL-ссылкой на фото; GET ?hash= отдаёт фото из резервного хранилища
 '''
 import json
 import base64
+import binascii
+import hashlib
 import os
-import requests
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
 
+from blob_store import IMAGE_CONTENT_TYPES, SHA256_RE, blob_url, find_upload, load_blob, remember_upload, store_blob
+from cdn_client import POOL_SIZE, upload_to_cdn
+from db import get_connection
+from instrument import instrumented
+
+VARIANT_UPLOAD_WORKERS = POOL_SIZE
+FILE_EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, X-Filename',
+    'Access-Control-Max-Age': '86400'
+}
+JSON_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+def get_request_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    request_headers = event.get('headers') or {}
+    lowered = name.lower()
+    for key, value in request_headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+def is_binary_upload(event: Dict[str, Any]) -> bool:
+    content_type = (get_request_header(event, 'Content-Type') or '').lower()
+    return bool(event.get('isBase64Encoded')) and not content_type.startswith('application/json')
+
+def upload_gallery_variants(cdn_api_key: str, project_id: str, filename: str, processed: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    '''
+    Загружает в CDN все варианты фото параллельно; None, если хотя бы один не загрузился
+    '''
+    stem = os.path.splitext(filename)[0] or 'photo'
+    
+    def upload_variant(variant: Dict[str, Any]) -> Optional[str]:
+        variant_name = f"{stem}-{variant['width']}.{FILE_EXTENSIONS[variant['format']]}"
+        return upload_to_cdn(cdn_api_key, project_id, variant_name, variant['content_type'], variant['data'])
+    
+    with ThreadPoolExecutor(max_workers=VARIANT_UPLOAD_WORKERS) as executor:
+        urls = list(executor.map(upload_variant, processed['variants']))
+    
+    if not all(urls):
+        return None
+    
+    variants = [
+        {'format': variant['format'], 'width': variant['width'], 'height': variant['height'], 'url': url}
+        for variant, url in zip(processed['variants'], urls)
+    ]
+    largest_jpeg = max((v for v in variants if v['format'] == 'jpeg'), key=lambda v: v['width'])
+    
+    return {
+        'url': largest_jpeg['url'],
+        'filename': filename,
+        'source_format': processed['format'],
+        'width': processed['width'],
+        'height': processed['height'],
+        'variants': variants,
+        'placeholder': processed['placeholder']
+    }
+
+def serve_blob(event: Dict[str, Any], digest: str) -> Dict[str, Any]:
+    if not SHA256_RE.match(digest):
+        return {
+            'statusCode': 400,
+            'headers': JSON_HEADERS,
+            'isBase64Encoded': False,
+            'body': json.dumps({'error': 'Invalid hash'})
+        }
+    
+    etag = f'"{digest}"'
+    # Содержимое адресуется хэшем и никогда не меняется, поэтому кэшируется навсегда
+    cache_headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Cache-Control': 'public, max-age=31536000, immutable',
+        'ETag': etag
+    }
+    if get_request_header(event, 'If-None-Match') == etag:
+        return {'statusCode': 304, 'headers': cache_headers, 'isBase64Encoded': False, 'body': ''}
+    
+    with get_connection() as conn:
+        cur = conn.cursor()
+        blob = load_blob(cur, digest)
+        cur.close()
+    
+    if blob is None:
+        return {
+            'statusCode': 404,
+            'headers': JSON_HEADERS,
+            'isBase64Encoded': False,
+            'body': json.dumps({'error': 'Not found'})
+        }
+    
+    blob_type, data = blob
+    # Отдаём только картинки: файл другого типа, сохранённый до проверки загрузок, браузер не исполнит
+    if blob_type not in IMAGE_CONTENT_TYPES:
+        blob_type = 'application/octet-stream'
+    return {
+        'statusCode': 200,
+        'headers': {**cache_headers, 'Content-Type': blob_type, 'X-Content-Type-Options': 'nosniff'},
+        'isBase64Encoded': True,
+        'body': base64.b64encode(data).decode('ascii')
+    }
+
+@instrumented
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'POST')
     
     if method == 'OPTIONS':
         return {
             'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Max-Age': '86400'
-            },
+            'headers': PREFLIGHT_HEADERS,
             'body': '',
             'isBase64Encoded': False
         }
     
+    if method == 'GET':
+        params = event.get('queryStringParameters') or {}
+        if params.get('hash'):
+            try:
+                return serve_blob(event, params['hash'])
+            except Exception as e:
+                return {
+                    'statusCode': 500,
+                    'headers': JSON_HEADERS,
+                    'isBase64Encoded': False,
+                    'body': json.dumps({'error': str(e)})
+                }
+    
     if method != 'POST':
         return {
             'statusCode': 405,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': JSON_HEADERS,
             'isBase64Encoded': False,
             'body': json.dumps({'error': 'Method not allowed'})
         }
     
     try:
-        body_data = json.loads(event.get('body', '{}'))
-        file_data = body_data.get('file')
-        filename = body_data.get('filename', 'photo.jpg')
+        if is_binary_upload(event):
+            # Платформа передаёт бинарное тело в base64: a2b_base64 читает ASCII-строку без промежуточной копии в bytes
+            params = event.get('queryStringParameters') or {}
+            filename = params.get('filename') or get_request_header(event, 'X-Filename') or 'photo.jpg'
+            image_bytes = binascii.a2b_base64(event.get('body') or '')
+            file_data = None
+        else:
+            body_data = json.loads(event.get('body', '{}'))
+            file_data = body_data.get('file')
+            filename = body_data.get('filename', 'photo.jpg')
+            image_bytes = None
+            
+            # MIME из data URL не используется: тип файла определяет Pillow по содержимому
+            if file_data and file_data.startswith('data:'):
+                file_data = file_data.split(',', 1)[1]
         
-        if not file_data:
+        if not file_data and not image_bytes:
             return {
                 'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
+                'headers': JSON_HEADERS,
                 'isBase64Encoded': False,
                 'body': json.dumps({'error': 'No file data provided'})
             }
         
-        if file_data.startswith('data:'):
-            file_data = file_data.split(',', 1)[1]
+        if image_bytes is None:
+            image_bytes = binascii.a2b_base64(file_data)
         
-        cdn_api_key = os.environ.get('CDN_API_KEY')
-        project_id = os.environ.get('PROJECT_ID')
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        try:
+            with get_connection() as conn:
+                cur = conn.cursor()
+                previous_upload = find_upload(cur, digest)
+                cur.close()
+        except Exception:
+            # Индекс дублей - лишь оптимизация: без базы загружаем как обычно
+            previous_upload = None
         
-        if not cdn_api_key or not project_id:
-            original_data = file_data if not file_data.startswith('data:') else file_data
-            if not original_data.startswith('data:'):
-                original_data = f'data:image/jpeg;base64,{file_data}'
-            
+        if previous_upload:
             return {
                 'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
+                'headers': JSON_HEADERS,
                 'isBase64Encoded': False,
-                'body': json.dumps({
-                    'url': original_data,
-                    'filename': filename
-                })
+                'body': json.dumps({**previous_upload, 'filename': filename, 'duplicate': True})
             }
         
+        # Pillow нужен только здесь: preflight, GET ?hash= и отказы валидации обходятся без его загрузки
+        from images import process_image
         try:
-            image_bytes = base64.b64decode(file_data)
-            
-            cdn_response = requests.post(
-                'https://cdn-api.poehali.dev/upload',
-                headers={
-                    'Authorization': f'Bearer {cdn_api_key}',
-                    'X-Project-ID': project_id
-                },
-                files={
-                    'file': (filename, image_bytes, 'image/jpeg')
-                },
-                timeout=10
-            )
+            processed = process_image(image_bytes)
+        except Exception:
+            # Принимаем только то, что Pillow смог декодировать: иначе под видом фото можно разместить HTML или скрипт
+            return {
+                'statusCode': 400,
+                'headers': JSON_HEADERS,
+                'isBase64Encoded': False,
+                'body': json.dumps({'error': 'File is not a supported image'})
+            }
+        
+        cdn_api_key = os.environ.get('CDN_API_KEY')
+        project_id = os.environ.get('PROJECT_ID')
+        
+        if cdn_api_key and project_id:
+            cdn_result = None
+            try:
+                cdn_result = upload_gallery_variants(cdn_api_key, project_id, filename, processed)
+                
+                if not cdn_result:
+                    cdn_url = upload_to_cdn(cdn_api_key, project_id, filename, processed['content_type'], image_bytes)
+                    if cdn_url:
+                        cdn_result = {
+                            'url': cdn_url,
+                            'filename': filename
+                        }
+            except Exception:
+                pass
             
-            if cdn_response.ok:
-                cdn_data = cdn_response.json()
+            if cdn_result:
+                try:
+                    with get_connection() as conn:
+                        cur = conn.cursor()
+                        remember_upload(cur, digest, cdn_result)
+                        conn.commit()
+                        cur.close()
+                except Exception:
+                    pass
+                
                 return {
                     'statusCode': 200,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
+                    'headers': JSON_HEADERS,
                     'isBase64Encoded': False,
-                    'body': json.dumps({
-                        'url': cdn_data.get('url'),
-                        'filename': filename
-                    })
+                    'body': json.dumps(cdn_result)
                 }
-        except Exception:
-            pass
         
-        original_data = file_data if file_data.startswith('data:') else f'data:image/jpeg;base64,{file_data}'
+        # CDN не настроен или не ответил: сохраняем файл в media_blobs вместо data URL в gallery_photos
+        largest_jpeg = max((v for v in processed['variants'] if v['format'] == 'jpeg'), key=lambda v: v['width'])
+        
+        with get_connection() as conn:
+            cur = conn.cursor()
+            digest = store_blob(cur, largest_jpeg['data'], largest_jpeg['content_type'])
+            conn.commit()
+            cur.close()
         
         return {
             'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': JSON_HEADERS,
             'isBase64Encoded': False,
             'body': json.dumps({
-                'url': original_data,
-                'filename': filename
+                'url': blob_url(digest),
+                'filename': filename,
+                'sha256': digest
             })
         }
         
+    except binascii.Error:
+        # Тело или file не являются корректным base64 - ошибка клиента, а не сервера
+        return {
+            'statusCode': 400,
+            'headers': JSON_HEADERS,
+            'isBase64Encoded': False,
+            'body': json.dumps({'error': 'Invalid base64 file data'})
+        }
     except Exception as e:
         return {
             'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': JSON_HEADERS,
             'isBase64Encoded': False,
             'body': json.dumps({'error': str(e)})
         }
\ No newline at end of file
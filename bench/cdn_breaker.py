@@ -0,0 +1,89 @@
+'''
+Business: Проверка предохранителя CDN-клиента upload-photo на заглушке CDN - размыкание после серии отказов,
+          пробная загрузка после паузы и восстановление, в том числе когда CDN отвечает 200 не в JSON
+Args: без аргументов; CDN_* задаются скриптом, заглушка CDN поднимается на локальном порту
+Returns: построчный отчёт по сценариям и метрики клиента; код выхода 1, если предохранитель повёл себя не так
+'''
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List, Tuple
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+BREAKER_RESET = 0.2
+
+# Ответы заглушки по очереди: (статус, тело)
+responses: List[Tuple[int, bytes]] = []
+
+
+class ScriptedCdnHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        remaining = int(self.headers.get('Content-Length', '0'))
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, 1024 * 1024)))
+        status, body = responses.pop(0) if responses else (500, b'')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def start_stub_cdn() -> str:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedCdnHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}/upload'
+
+
+def main() -> None:
+    os.environ.update({
+        'CDN_UPLOAD_URL': start_stub_cdn(),
+        'CDN_MAX_ATTEMPTS': '1',
+        'CDN_BREAKER_THRESHOLD': '2',
+        'CDN_BREAKER_RESET': str(BREAKER_RESET)
+    })
+    sys.path.insert(0, os.path.join(BACKEND_DIR, 'upload-photo'))
+    from cdn_client import get_metrics, upload_to_cdn
+
+    def upload() -> Any:
+        return upload_to_cdn('bench', 'bench', 'check.jpg', 'image/jpeg', b'\xff\xd8\xff')
+
+    ok_body = json.dumps({'url': 'https://cdn.example/check.jpg'}).encode('utf-8')
+    checks = []
+
+    responses[:] = [(500, b''), (500, b'')]
+    upload()
+    upload()
+    checks.append(('opens after threshold failures', upload() is None and get_metrics()['short_circuited'] == 1))
+
+    time.sleep(BREAKER_RESET * 1.5)
+    responses[:] = [(200, b'<html>gateway</html>')]
+    checks.append(('non-JSON 200 probe fails cleanly', upload() is None))
+    checks.append(('re-opens after failed probe', upload() is None and get_metrics()['short_circuited'] == 2))
+
+    time.sleep(BREAKER_RESET * 1.5)
+    responses[:] = [(200, b'["not", "an", "object"]')]
+    checks.append(('non-object JSON probe fails cleanly', upload() is None))
+
+    time.sleep(BREAKER_RESET * 1.5)
+    responses[:] = [(200, ok_body), (200, ok_body)]
+    checks.append(('closes after successful probe', upload() == 'https://cdn.example/check.jpg'))
+    checks.append(('uploads pass when closed', upload() == 'https://cdn.example/check.jpg'))
+
+    print()
+    for name, passed in checks:
+        print(f"{'ok  ' if passed else 'FAIL'} {name}")
+    print(json.dumps(get_metrics()))
+    if not all(passed for _, passed in checks):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
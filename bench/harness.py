@@ -0,0 +1,481 @@
+'''
+Business: Нагрузочный бенчмарк всех функций backend/ - сценарии из tests.json и синтетические нагрузки на одноразовой базе
+Args: DATABASE_URL - сервер Postgres, на котором создаётся временная база (без него поднимается pgserver, если установлен)
+      --functions, --requests, --concurrency - что и с какой параллельностью гонять
+      --feedback, --sports, --gallery - объём синтетических данных
+      --baseline, --update-baseline, --tolerance - сравнение с сохранёнными результатами
+Returns: p50/p95/p99 в миллисекундах, запросов к БД на вызов и пиковый RSS по каждой функции;
+         код выхода 1, если результаты хуже baseline
+'''
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+from urllib.parse import parse_qsl, urlsplit
+
+import psycopg2
+from psycopg2.extensions import make_dsn, parse_dsn
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+MIGRATIONS_DIR = os.path.join(ROOT_DIR, 'db_migrations')
+SCHEMA = 't_p40618121_yenisei_sport_hall_1'
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# Наименьший валидный PNG 1x1 - для загрузки фото без CDN (сохраняется в media_blobs)
+TINY_PNG = (
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+# Сценарии сверх tests.json. {i} в теле заменяется номером вызова, {gallery_id} - id фото из засеянных данных
+SYNTHETIC_CASES: Dict[str, List[Dict[str, Any]]] = {
+    'content': [
+        {'name': 'public content', 'method': 'GET', 'path': '/', 'expectedStatus': 200},
+        {'name': 'gallery first page', 'method': 'GET', 'path': '/?type=gallery', 'expectedStatus': 200},
+        {'name': 'gallery photo detail', 'method': 'GET', 'path': '/?type=gallery&id={gallery_id}', 'expectedStatus': 200}
+    ],
+    'feedback-manage': [
+        {'name': 'active page', 'method': 'GET', 'path': '/?archived=false&limit=50', 'expectedStatus': 200},
+        {'name': 'dashboard', 'method': 'GET', 'path': '/?mode=dashboard', 'expectedStatus': 200},
+        {'name': 'counters poll', 'method': 'GET', 'path': '/?mode=counters', 'expectedStatus': 200},
+        {'name': 'search rare term', 'method': 'GET', 'path': '/?mode=search&q=user777', 'expectedStatus': 200},
+        {'name': 'search common term', 'method': 'GET', 'path': '/?mode=search&q=trainings&order=recent', 'expectedStatus': 200}
+    ],
+    'feedback-stats': [
+        {'name': 'stats', 'method': 'GET', 'path': '/', 'expectedStatus': 200}
+    ],
+    'send-email': [
+        {
+            'name': 'unique submission',
+            'method': 'POST',
+            'path': '/',
+            'body': {'name': 'Bench', 'email': 'bench{i}@example.com', 'message': 'Benchmark message {i}'},
+            'expectedStatus': 200
+        }
+    ],
+    'documents': [
+        {'name': 'full pdf', 'method': 'GET', 'path': '/?type=rules', 'expectedStatus': 200},
+        {'name': 'first 64 KB range', 'method': 'GET', 'path': '/?type=rules', 'headers': {'Range': 'bytes=0-65535'}, 'expectedStatus': 206}
+    ],
+    'feedback-notify': [
+        {'name': 'outbox stats', 'method': 'GET', 'path': '/', 'expectedStatus': 200}
+    ],
+    'upload-photo': [
+        {
+            'name': 'tiny photo without CDN',
+            'method': 'POST',
+            'path': '/',
+            'body': {'file': f'data:image/png;base64,{TINY_PNG}', 'filename': 'bench.png'},
+            'expectedStatus': 200
+        }
+    ]
+}
+
+# Окружение функций под замер: без кэша ответов, лимитов и внешних сервисов, чтобы мерился путь до базы
+WORKER_ENV = {
+    'CONTENT_CACHE_TTL': '0',
+    'CONTACT_RATE_IP_BURST': '0',
+    'CONTACT_RATE_EMAIL_BURST': '0',
+    'CONTACT_DUPLICATE_WINDOW': '0',
+    'CONTACT_BATCH_SIZE': '0',
+    'CDN_API_KEY': '',
+    'SMTP_HOST': '',
+    # Запросы считает сам воркер своей фабрикой соединений; instrument.py подменил бы её своей
+    'INSTRUMENTATION': '0'
+}
+
+# Выполняется в отдельном процессе на функцию: у каждой свои index.py и db.py с одинаковыми именами модулей
+WORKER = r'''
+import json, re, resource, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+# ru_maxrss наследуется через fork/exec и показывал бы пик самого harness; VmHWM сбрасывается
+# записью 5 в clear_refs и дальше отражает только этот процесс: интерпретатор, импорт функции и вызовы
+try:
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    RSS_SOURCE = 'VmHWM'
+except OSError:
+    RSS_SOURCE = 'ru_maxrss'
+
+def peak_rss_mb():
+    if RSS_SOURCE == 'VmHWM':
+        with open('/proc/self/status') as status:
+            return int(re.search(r'VmHWM:\s+(\d+) kB', status.read()).group(1)) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+config = json.load(sys.stdin)
+sys.path.insert(0, config['function_dir'])
+
+import psycopg2
+import psycopg2.extensions
+
+_local = threading.local()
+_cursor_classes = {}
+
+def counting_cursor_class(base):
+    if base not in _cursor_classes:
+        class CountingCursor(base):
+            def execute(self, query, vars=None):
+                _local.queries = getattr(_local, 'queries', 0) + 1
+                return super().execute(query, vars)
+
+            def executemany(self, query, vars_list):
+                _local.queries = getattr(_local, 'queries', 0) + 1
+                return super().executemany(query, vars_list)
+        _cursor_classes[base] = CountingCursor
+    return _cursor_classes[base]
+
+class CountingConnection(psycopg2.extensions.connection):
+    def cursor(self, *args, **kwargs):
+        base = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs['cursor_factory'] = counting_cursor_class(base)
+        return super().cursor(*args, **kwargs)
+
+_connect = psycopg2.connect
+
+def counting_connect(*args, **kwargs):
+    kwargs.setdefault('connection_factory', CountingConnection)
+    return _connect(*args, **kwargs)
+
+# psycopg2.pool вызывает psycopg2.connect при каждом новом соединении
+psycopg2.connect = counting_connect
+
+from index import handler
+
+class Context:
+    function_name = config['function']
+    def __init__(self, request_id):
+        self.request_id = request_id
+
+def call(case, number):
+    body = case.get('body')
+    event = {
+        'httpMethod': case['method'],
+        'headers': dict(case.get('headers') or {}),
+        'queryStringParameters': case.get('query') or {},
+        'body': body.replace('{i}', str(number)) if body is not None else None,
+        'isBase64Encoded': False
+    }
+    _local.queries = 0
+    started = time.perf_counter()
+    try:
+        status = handler(event, Context(f'bench-{number}'))['statusCode']
+    except Exception:
+        status = None
+    elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, _local.queries, status
+
+results = []
+sequence = 0
+with ThreadPoolExecutor(max_workers=config['concurrency']) as executor:
+    for case in config['cases']:
+        # Прогрев заполняет пул соединениями, чтобы их SELECT 1 при выдаче не попадал в замер
+        list(executor.map(lambda number: call(case, number), range(sequence, sequence + config['concurrency'])))
+        sequence += config['concurrency']
+        numbers = range(sequence, sequence + config['requests'])
+        sequence += config['requests']
+        samples = list(executor.map(lambda number: call(case, number), numbers))
+        expected = case.get('expectedStatus')
+        results.append({
+            'name': case['name'],
+            'latencies': [sample[0] for sample in samples],
+            'queries': [sample[1] for sample in samples],
+            'errors': sum(1 for sample in samples if sample[2] is None or (expected is not None and sample[2] != expected))
+        })
+
+with open(config['output'], 'w') as output:
+    json.dump({'cases': results, 'peak_rss_mb': peak_rss_mb()}, output)
+'''
+
+
+@contextmanager
+def disposable_database() -> Iterator[str]:
+    '''
+    Создаёт временную базу на сервере из DATABASE_URL или в локальном pgserver и удаляет её по завершении
+    '''
+    server = None
+    admin_dsn = os.environ.get('DATABASE_URL')
+    if not admin_dsn:
+        try:
+            import pgserver
+        except ImportError:
+            sys.exit('Set DATABASE_URL or install pgserver (pip install pgserver) for a throwaway local Postgres')
+        server = pgserver.get_server(tempfile.mkdtemp(prefix='bench-pg-'), cleanup_mode='delete')
+        admin_dsn = server.get_uri()
+
+    dbname = f'bench_{uuid.uuid4().hex[:12]}'
+    admin = psycopg2.connect(admin_dsn)
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f'CREATE DATABASE {dbname}')
+    try:
+        yield make_dsn(admin_dsn, dbname=dbname)
+    finally:
+        with admin.cursor() as cur:
+            cur.execute(f'DROP DATABASE IF EXISTS {dbname} WITH (FORCE)')
+        admin.close()
+        if server is not None:
+            server.cleanup()
+
+
+def apply_migrations(dsn: str) -> None:
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f'CREATE SCHEMA {SCHEMA}')
+        cur.execute(f'ALTER DATABASE {parse_dsn(dsn)["dbname"]} SET search_path TO {SCHEMA}')
+    conn.close()
+
+    # search_path из ALTER DATABASE действует только для новых сессий
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+            if filename.endswith('.sql'):
+                with open(os.path.join(MIGRATIONS_DIR, filename), encoding='utf-8') as migration:
+                    cur.execute(migration.read())
+    conn.close()
+
+
+def seed(dsn: str, feedback: int, sports: int, gallery: int) -> Dict[str, str]:
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+
+    cur.execute('SELECT COUNT(*) FROM sports')
+    existing_sports = cur.fetchone()[0]
+    cur.execute(
+        """
+        INSERT INTO sports (id, name, image, video, display_order)
+        SELECT 'bench_' || g, 'Sport ' || g, 'https://example.com/sport-' || g || '.jpg',
+               'https://example.com/video-' || g, 100 + g
+        FROM generate_series(1, %s) g
+        """,
+        (max(0, sports - existing_sports),)
+    )
+    cur.execute(
+        """
+        INSERT INTO sport_rules (sport_id, rule_text, display_order)
+        SELECT s.id, 'Rule ' || n || ' for ' || s.name, n FROM sports s, generate_series(1, 5) n WHERE s.id LIKE 'bench_%%'
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO sport_safety (sport_id, safety_text, display_order)
+        SELECT s.id, 'Safety ' || n || ' for ' || s.name, n FROM sports s, generate_series(1, 3) n WHERE s.id LIKE 'bench_%%'
+        """
+    )
+
+    # Построчный триггер счётчиков на массовой вставке - лишние минуты; счётчики пересчитываются одним запросом ниже
+    cur.execute('ALTER TABLE feedback_messages DISABLE TRIGGER USER')
+    cur.execute(
+        """
+        INSERT INTO feedback_messages (name, email, message, created_at, is_read, is_archived)
+        SELECT 'User ' || g, 'user' || g || '@example.com',
+               'Question about trainings number ' || g || ' ' || md5(g::text),
+               CURRENT_TIMESTAMP - make_interval(mins => g), g %% 3 <> 0, g %% 10 = 0
+        FROM generate_series(1, %s) g
+        """,
+        (feedback,)
+    )
+    cur.execute('ALTER TABLE feedback_messages ENABLE TRIGGER USER')
+    cur.execute(
+        """
+        UPDATE feedback_counters c
+        SET total_count = s.total, unread_count = s.unread, archived_count = s.archived, version = c.version + 1
+        FROM (
+            SELECT COUNT(*) AS total, COUNT(*) FILTER (WHERE NOT is_read) AS unread, COUNT(*) FILTER (WHERE is_archived) AS archived
+            FROM feedback_messages
+        ) s
+        WHERE c.id = 1
+        """
+    )
+
+    cur.execute(
+        """
+        INSERT INTO gallery_photos (url, title, description, width, height, created_at)
+        SELECT 'https://example.com/photo-' || g || '.jpg', 'Photo ' || g, 'Description of photo ' || g,
+               1280, 960, CURRENT_TIMESTAMP - make_interval(mins => g)
+        FROM generate_series(1, %s) g
+        """,
+        (gallery,)
+    )
+    cur.execute(
+        """
+        INSERT INTO gallery_photo_variants (photo_id, format, width, height, url)
+        SELECT p.id, f.format, w.width, w.width * 3 / 4, p.url || '?w=' || w.width || '&f=' || f.format
+        FROM gallery_photos p, (VALUES ('webp'), ('jpeg')) f(format), (VALUES (320), (640), (1280)) w(width)
+        ON CONFLICT DO NOTHING
+        """
+    )
+    cur.execute('SELECT id FROM gallery_photos ORDER BY created_at DESC, id DESC LIMIT 1')
+    gallery_row = cur.fetchone()
+
+    for doc_type in ('rules', 'prices', 'benefits', 'schedule'):
+        cur.execute(
+            "INSERT INTO documents (doc_type, file_data, mime_type) VALUES (%s, %s, 'application/pdf')",
+            (doc_type, b'%PDF-1.4\n' + os.urandom(1024 * 1024))
+        )
+
+    conn.commit()
+    conn.autocommit = True
+    cur.execute('ANALYZE')
+    conn.close()
+    return {'gallery_id': str(gallery_row[0]) if gallery_row else '0'}
+
+
+def load_cases(function: str, placeholders: Dict[str, str]) -> List[Dict[str, Any]]:
+    cases = []
+    tests_path = os.path.join(BACKEND_DIR, function, 'tests.json')
+    if os.path.exists(tests_path):
+        with open(tests_path, encoding='utf-8') as tests_file:
+            cases += [dict(test, name=f"tests.json: {test['name']}") for test in json.load(tests_file)['tests']]
+    cases += [dict(case, name=f"synthetic: {case['name']}") for case in SYNTHETIC_CASES.get(function, [])]
+
+    prepared = []
+    for case in cases:
+        path = case.get('path', '/')
+        for key, value in placeholders.items():
+            path = path.replace('{' + key + '}', value)
+        body = case.get('body')
+        prepared.append({
+            'name': case['name'],
+            'method': case['method'],
+            'query': dict(parse_qsl(urlsplit(path).query)),
+            'headers': case.get('headers') or {},
+            'body': body if body is None or isinstance(body, str) else json.dumps(body, ensure_ascii=False),
+            'expectedStatus': case.get('expectedStatus')
+        })
+    return prepared
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, int(round(len(ordered) * fraction)) - 1))]
+
+
+def run_function(function: str, dsn: str, cases: List[Dict[str, Any]], requests: int, concurrency: int) -> Dict[str, Any]:
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as output:
+        output_path = output.name
+    config = {
+        'function': function,
+        'function_dir': os.path.join(BACKEND_DIR, function),
+        'cases': cases,
+        'requests': requests,
+        'concurrency': concurrency,
+        'output': output_path
+    }
+    env = dict(os.environ, DATABASE_URL=dsn, DB_POOL_MAX=str(max(4, concurrency)), **WORKER_ENV)
+    try:
+        # Вывод функций (логи, print) не смешивается с отчётом
+        subprocess.run(
+            [sys.executable, '-c', WORKER], input=json.dumps(config), env=env, check=True,
+            text=True, stdout=subprocess.DEVNULL
+        )
+        with open(output_path) as result_file:
+            raw = json.load(result_file)
+    finally:
+        os.unlink(output_path)
+
+    summary = {'peak_rss_mb': round(raw['peak_rss_mb'], 1), 'cases': {}}
+    for case in raw['cases']:
+        ordered = sorted(case['latencies'])
+        summary['cases'][case['name']] = {
+            'p50': round(percentile(ordered, 0.50), 3),
+            'p95': round(percentile(ordered, 0.95), 3),
+            'p99': round(percentile(ordered, 0.99), 3),
+            'queries': round(sum(case['queries']) / len(case['queries']), 2),
+            'errors': case['errors']
+        }
+    return summary
+
+
+def find_regressions(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, slack_ms: float) -> List[str]:
+    '''
+    Латентность и память сравниваются с допуском (шум машины), ошибки - строго. Лишний запрос на вызов
+    даёт +1 к среднему, а редкие проверки соединений пула - доли, поэтому порог по запросам 0.5
+    '''
+    regressions = []
+    for function, summary in results.items():
+        expected = baseline.get(function)
+        if not expected:
+            continue
+        if summary['peak_rss_mb'] > expected['peak_rss_mb'] * (1 + tolerance) + 5:
+            regressions.append(f"{function}: peak RSS {summary['peak_rss_mb']} MB > {expected['peak_rss_mb']} MB")
+        for name, case in summary['cases'].items():
+            before = expected['cases'].get(name)
+            if not before:
+                continue
+            if case['p95'] > before['p95'] * (1 + tolerance) + slack_ms:
+                regressions.append(f"{function} / {name}: p95 {case['p95']} ms > {before['p95']} ms")
+            if case['queries'] > before['queries'] + 0.5:
+                regressions.append(f"{function} / {name}: {case['queries']} queries/request > {before['queries']}")
+            if case['errors'] > before['errors']:
+                regressions.append(f"{function} / {name}: {case['errors']} unexpected statuses > {before['errors']}")
+    return regressions
+
+
+def main() -> None:
+    available = sorted(
+        name for name in os.listdir(BACKEND_DIR) if os.path.exists(os.path.join(BACKEND_DIR, name, 'index.py'))
+    )
+    parser = argparse.ArgumentParser(description='Benchmark every backend function against a disposable Postgres')
+    parser.add_argument('--functions', nargs='+', choices=available, default=available)
+    parser.add_argument('--requests', type=int, default=200, help='measured calls per case')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--feedback', type=int, default=10000)
+    parser.add_argument('--sports', type=int, default=50)
+    parser.add_argument('--gallery', type=int, default=5000)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative p95/RSS growth')
+    parser.add_argument('--slack-ms', type=float, default=2.0, help='allowed absolute p95 growth')
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {}
+    with disposable_database() as dsn:
+        apply_migrations(dsn)
+        placeholders = seed(dsn, args.feedback, args.sports, args.gallery)
+        for function in args.functions:
+            cases = load_cases(function, placeholders)
+            results[function] = run_function(function, dsn, cases, args.requests, args.concurrency)
+
+    for function, summary in results.items():
+        print(f"{function}  (peak RSS {summary['peak_rss_mb']:.1f} MB)")
+        for name, case in summary['cases'].items():
+            print(
+                f"  {name:<48} p50={case['p50']:8.3f}  p95={case['p95']:8.3f}  p99={case['p99']:8.3f} ms"
+                f"  queries={case['queries']:5.2f}  errors={case['errors']}"
+            )
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as baseline_file:
+                baseline = json.load(baseline_file)
+        baseline.update(results)
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, ensure_ascii=False, sort_keys=True)
+            baseline_file.write('\n')
+        print(f'Baseline written to {args.baseline}')
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            regressions = find_regressions(results, json.load(baseline_file), args.tolerance, args.slack_ms)
+        if regressions:
+            print('\nRegressions against baseline:')
+            for regression in regressions:
+                print(f'  {regression}')
+            sys.exit(1)
+        print('\nNo regressions against baseline')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+'''
+Business: Стоимость холодного старта каждой функции backend/ - время импорта index по python -X importtime и тяжёлые модули,
+          загруженные к моменту ответа на CORS preflight
+Args: --functions - папки функций, --runs - число холодных запусков (берётся медиана)
+      --baseline, --update-baseline, --tolerance, --slack-ms - сравнение с сохранёнными результатами.
+      Вперемешку с функциями импортируется эталонный набор модулей стандартной библиотеки: время функций
+      пересчитывается к скорости машины, на которой снят baseline, поэтому загрузка машины не даёт ложных регрессий
+Returns: время импорта index в миллисекундах, самые дорогие прямые зависимости и список тяжёлых модулей после OPTIONS;
+         код выхода 1, если импорт заметно подорожал или preflight начал тянуть драйвер БД / HTTP-клиент
+'''
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'backend')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'import_baseline.json')
+
+# Модули, которых не должно быть в процессе после ответа на preflight
+HEAVY_MODULES = ('psycopg2', 'requests', 'urllib3', 'PIL')
+
+# Выполняется в отдельном холодном интерпретаторе в папке функции: импорт index и один OPTIONS
+WORKER = '''
+import json, sys
+import index
+response = index.handler({'httpMethod': 'OPTIONS', 'headers': {}, 'queryStringParameters': None, 'body': None}, None)
+heavy = sorted(name for name in %r if name in sys.modules)
+print(json.dumps({'status': response['statusCode'], 'heavy': heavy}))
+''' % (HEAVY_MODULES,)
+
+# Эталон скорости импорта на этой машине в этот момент: модули, которые функции тянут и сами
+REFERENCE_MODULES = ('email.utils', 'concurrent.futures', 'datetime', 'hashlib', 'uuid', 'argparse')
+REFERENCE = 'import ' + ', '.join(REFERENCE_MODULES)
+# Baseline снимается по большему числу запусков, чем обычная проверка
+BASELINE_MIN_RUNS = 15
+
+
+def parse_reference(stderr: str) -> float:
+    '''Сумма кумулятивных времён эталонных модулей верхнего уровня (в мс)'''
+    total = 0.0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        if name[1:] in REFERENCE_MODULES:
+            total += int(cumulative) / 1000
+    return total
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]]]:
+    '''Кумулятивное время импорта index и его прямых зависимостей (в мс) из вывода -X importtime'''
+    total = 0.0
+    children: List[Tuple[str, float]] = []
+    pending: List[Tuple[int, str, float]] = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        pending.append((depth, name.strip(), int(cumulative) / 1000))
+        # Вывод идёт в порядке завершения импорта: дочерние модули печатаются раньше родителя
+        if depth == 0 and name.strip() == 'index':
+            total = int(cumulative) / 1000
+            children = [(child, ms) for child_depth, child, ms in pending if child_depth == 1]
+        if depth == 0:
+            pending = []
+    children.sort(key=lambda item: item[1], reverse=True)
+    return total, children
+
+
+def measure(function: str, runs: int, pycache_dir: str) -> Dict[str, Any]:
+    function_dir = os.path.join(BACKEND_DIR, function)
+    # Без DATABASE_URL: ни импорт, ни preflight не должны обращаться к базе.
+    # Байткод пишется во временный каталог, а не в репозиторий: замер не зависит от того,
+    # остались ли .pyc от прошлых запусков и разрешена ли их запись (PYTHONDONTWRITEBYTECODE)
+    env = {key: value for key, value in os.environ.items() if key not in ('DATABASE_URL', 'PYTHONDONTWRITEBYTECODE')}
+    env['PYTHONPYCACHEPREFIX'] = pycache_dir
+    # Первый, незамеряемый запуск компилирует исходники функции
+    subprocess.run([sys.executable, '-c', WORKER], cwd=function_dir, env=env, capture_output=True, check=True)
+
+    totals: List[float] = []
+    references: List[float] = []
+    children: Dict[str, List[float]] = {}
+    heavy: List[str] = []
+    for _ in range(runs):
+        reference = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', REFERENCE],
+            env=env, capture_output=True, text=True, check=True
+        )
+        references.append(parse_reference(reference.stderr))
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', WORKER],
+            cwd=function_dir, env=env, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f'{function}: {completed.stderr.strip().splitlines()[-1]}')
+        total, direct = parse_importtime(completed.stderr)
+        totals.append(total)
+        for name, ms in direct:
+            children.setdefault(name, []).append(ms)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        heavy = sorted(set(heavy) | set(result['heavy']))
+
+    slowest = sorted(((name, statistics.median(values)) for name, values in children.items()), key=lambda item: item[1], reverse=True)
+    return {
+        'import_ms': round(statistics.median(totals), 2),
+        'reference_ms': round(statistics.median(references), 2),
+        'heavy_after_preflight': heavy,
+        'slowest_imports': {name: round(ms, 2) for name, ms in slowest[:5]}
+    }
+
+
+def find_regressions(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, slack_ms: float) -> List[str]:
+    regressions = []
+    for function, result in results.items():
+        expected = baseline.get(function)
+        if not expected:
+            continue
+        # Время пересчитывается к скорости машины на момент снятия baseline по эталонному импорту
+        scale = expected['reference_ms'] / result['reference_ms'] if expected.get('reference_ms') and result['reference_ms'] else 1.0
+        normalized = result['import_ms'] * scale
+        limit = expected['import_ms'] * (1 + tolerance) + slack_ms
+        if normalized > limit:
+            regressions.append(
+                f"{function}: import {result['import_ms']} ms (normalized {normalized:.2f} ms) > {limit:.2f} ms"
+            )
+        new_heavy = sorted(set(result['heavy_after_preflight']) - set(expected.get('heavy_after_preflight', [])))
+        if new_heavy:
+            regressions.append(f"{function}: preflight now loads {', '.join(new_heavy)}")
+    return regressions
+
+
+def main() -> None:
+    available = sorted(
+        name for name in os.listdir(BACKEND_DIR)
+        if os.path.isfile(os.path.join(BACKEND_DIR, name, 'index.py'))
+    )
+    parser = argparse.ArgumentParser(description='Measure cold-start import cost of every backend function')
+    parser.add_argument('--functions', nargs='+', choices=available, default=available)
+    parser.add_argument('--runs', type=int, default=7, help='cold interpreter starts per function')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative import time growth')
+    parser.add_argument('--slack-ms', type=float, default=5.0, help='allowed absolute import time growth')
+    args = parser.parse_args()
+
+    runs = max(args.runs, BASELINE_MIN_RUNS) if args.update_baseline else args.runs
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix='import-time-') as pycache_dir:
+        for function in args.functions:
+            result = measure(function, runs, pycache_dir)
+            results[function] = result
+            slowest = ', '.join(f'{name} {ms:.1f}' for name, ms in result['slowest_imports'].items())
+            heavy = ', '.join(result['heavy_after_preflight']) or '-'
+            print(
+                f"{function:<16} import {result['import_ms']:>7.1f} ms  reference {result['reference_ms']:>6.1f} ms   "
+                f"heavy after OPTIONS: {heavy:<20} slowest: {slowest}"
+            )
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as baseline_file:
+                baseline = json.load(baseline_file)
+        baseline.update({
+            function: {
+                'import_ms': result['import_ms'],
+                'reference_ms': result['reference_ms'],
+                'heavy_after_preflight': result['heavy_after_preflight']
+            }
+            for function, result in results.items()
+        })
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, ensure_ascii=False, sort_keys=True)
+            baseline_file.write('\n')
+        print(f'Baseline written to {args.baseline}')
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            regressions = find_regressions(results, json.load(baseline_file), args.tolerance, args.slack_ms)
+        if regressions:
+            print('\nRegressions against baseline:')
+            for regression in regressions:
+                print(f'  {regression}')
+            sys.exit(1)
+        print('\nNo regressions against baseline')
+
+
+if __name__ == '__main__':
+    main()
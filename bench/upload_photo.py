@@ -0,0 +1,125 @@
+'''
+Business: Бенчмарк памяти и задержки upload-photo для JSON/base64 и бинарного режима загрузки
+Args: --sizes - размеры фото в мегабайтах, --repeat - число повторов на размер;
+      DATABASE_URL - если задан, дополнительно замеряется повторная загрузка тех же байтов (индекс дублей)
+Returns: пиковый объём выделенной Python-памяти (tracemalloc) и задержка для каждого режима
+'''
+
+import argparse
+import base64
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+
+class StubCdnHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        remaining = int(self.headers.get('Content-Length', '0'))
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, 1024 * 1024)))
+        body = json.dumps({'url': 'https://cdn.example/photo.jpg'}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def start_stub_cdn() -> str:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubCdnHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}/upload'
+
+
+def random_image_b64(size_mb: float) -> str:
+    '''BMP из случайных пикселей: несжатый, поэтому размер файла примерно равен size_mb, а байты каждый раз новые'''
+    from PIL import Image
+    width = 1024
+    height = max(1, int(size_mb * 1024 * 1024) // (width * 3))
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (width, height), os.urandom(width * height * 3)).save(buffer, 'BMP')
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def json_event(image_b64: str) -> Dict[str, Any]:
+    return {
+        'httpMethod': 'POST',
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'file': f'data:image/jpeg;base64,{image_b64}', 'filename': 'bench.jpg'})
+    }
+
+
+def binary_event(image_b64: str) -> Dict[str, Any]:
+    return {
+        'httpMethod': 'POST',
+        'headers': {'Content-Type': 'image/jpeg', 'X-Filename': 'bench.jpg'},
+        'isBase64Encoded': True,
+        'body': image_b64
+    }
+
+
+def measure(handler: Any, make_event: Callable[[], Dict[str, Any]], repeat: int) -> Dict[str, float]:
+    timings = []
+    peaks = []
+    for _ in range(repeat):
+        # Событие собирается до замера: генерация случайных байтов не входит ни во время, ни в пик памяти
+        event = make_event()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        response = handler(event, None)
+        timings.append((time.perf_counter() - started) * 1000)
+        peaks.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024 / 1024)
+        assert response['statusCode'] == 200, response['body']
+        del event
+    return {'latency': statistics.median(timings), 'peak': max(peaks)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='upload-photo memory/latency benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 10, 20])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ['CDN_UPLOAD_URL'] = start_stub_cdn()
+    os.environ.setdefault('CDN_API_KEY', 'bench')
+    os.environ.setdefault('PROJECT_ID', 'bench')
+    # Замеряется сам handler: JSON-логи instrument в stdout перемешались бы с отчётом
+    os.environ.setdefault('INSTRUMENTATION', '0')
+    sys.path.insert(0, os.path.join(BACKEND_DIR, 'upload-photo'))
+    from index import handler
+
+    # Pillow, requests и psycopg2 импортируются при первой загрузке - прогреваем их до начала замеров памяти
+    handler(binary_event(random_image_b64(0.01)), None)
+
+    tracemalloc.start()
+    for size_mb in args.sizes:
+        # Каждый замер загружает новые случайные байты, иначе с базой повторы уходили бы в индекс дублей
+        cases = [
+            ('json', lambda: json_event(random_image_b64(size_mb))),
+            ('binary', lambda: binary_event(random_image_b64(size_mb)))
+        ]
+        if os.environ.get('DATABASE_URL'):
+            repeated_b64 = random_image_b64(size_mb)
+            handler(binary_event(repeated_b64), None)
+            cases.append(('dedup', lambda: binary_event(repeated_b64)))
+        for label, make_event in cases:
+            result = measure(handler, make_event, args.repeat)
+            print(f"{size_mb:>3} MB  {label:<7} latency={result['latency']:8.1f} ms  peak={result['peak']:7.1f} MB")
+        cases.clear()
+
+
+if __name__ == '__main__':
+    main()
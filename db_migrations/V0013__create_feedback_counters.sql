@@ -0,0 +1,73 @@
+-- Счётчики сообщений обратной связи, поддерживаемые триггером, чтобы опрос бейджа не сканировал таблицу
+CREATE TABLE IF NOT EXISTS t_p40618121_yenisei_sport_hall_1.feedback_counters (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_count BIGINT NOT NULL DEFAULT 0,
+    unread_count BIGINT NOT NULL DEFAULT 0,
+    archived_count BIGINT NOT NULL DEFAULT 0,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO t_p40618121_yenisei_sport_hall_1.feedback_counters (id, total_count, unread_count, archived_count, version)
+SELECT
+    1,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE NOT is_read),
+    COUNT(*) FILTER (WHERE is_archived),
+    1
+FROM t_p40618121_yenisei_sport_hall_1.feedback_messages
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION t_p40618121_yenisei_sport_hall_1.feedback_counters_sync()
+RETURNS TRIGGER AS $$
+DECLARE
+    d_total BIGINT := 0;
+    d_unread BIGINT := 0;
+    d_archived BIGINT := 0;
+BEGIN
+    -- TRUNCATE не вызывает построчные триггеры: обнуляем счётчики целиком
+    IF TG_OP = 'TRUNCATE' THEN
+        UPDATE t_p40618121_yenisei_sport_hall_1.feedback_counters
+        SET total_count = 0,
+            unread_count = 0,
+            archived_count = 0,
+            version = version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = 1;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        d_total := d_total + 1;
+        d_unread := d_unread + (NOT NEW.is_read)::INT;
+        d_archived := d_archived + NEW.is_archived::INT;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        d_total := d_total - 1;
+        d_unread := d_unread - (NOT OLD.is_read)::INT;
+        d_archived := d_archived - OLD.is_archived::INT;
+    END IF;
+
+    IF d_total <> 0 OR d_unread <> 0 OR d_archived <> 0 THEN
+        UPDATE t_p40618121_yenisei_sport_hall_1.feedback_counters
+        SET total_count = total_count + d_total,
+            unread_count = unread_count + d_unread,
+            archived_count = archived_count + d_archived,
+            version = version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_feedback_counters_sync
+AFTER INSERT OR UPDATE OF is_read, is_archived OR DELETE
+ON t_p40618121_yenisei_sport_hall_1.feedback_messages
+FOR EACH ROW EXECUTE FUNCTION t_p40618121_yenisei_sport_hall_1.feedback_counters_sync();
+
+CREATE TRIGGER trg_feedback_counters_truncate
+AFTER TRUNCATE
+ON t_p40618121_yenisei_sport_hall_1.feedback_messages
+FOR EACH STATEMENT EXECUTE FUNCTION t_p40618121_yenisei_sport_hall_1.feedback_counters_sync();
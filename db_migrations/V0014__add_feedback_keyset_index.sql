@@ -0,0 +1,3 @@
+-- Индекс под постраничную выдачу: WHERE is_archived = ? ORDER BY created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_feedback_archived_created_id
+ON t_p40618121_yenisei_sport_hall_1.feedback_messages (is_archived, created_at DESC, id DESC);
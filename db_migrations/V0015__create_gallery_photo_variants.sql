@@ -0,0 +1,16 @@
+-- Адаптивные варианты фото галереи (WebP/JPEG разной ширины) и плейсхолдер для первой отрисовки
+ALTER TABLE gallery_photos
+ADD COLUMN IF NOT EXISTS width INTEGER,
+ADD COLUMN IF NOT EXISTS height INTEGER,
+ADD COLUMN IF NOT EXISTS placeholder TEXT;
+
+CREATE TABLE IF NOT EXISTS gallery_photo_variants (
+    id SERIAL PRIMARY KEY,
+    photo_id INTEGER NOT NULL REFERENCES gallery_photos(id) ON DELETE CASCADE,
+    format VARCHAR(10) NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER,
+    url TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT unique_gallery_photo_variant UNIQUE (photo_id, format, width)
+);
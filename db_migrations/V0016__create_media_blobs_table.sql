@@ -0,0 +1,8 @@
+-- Резервное хранилище фото, когда CDN недоступен: файлы адресуются SHA-256 и не дублируются
+CREATE TABLE IF NOT EXISTS media_blobs (
+    sha256 CHAR(64) PRIMARY KEY,
+    content_type VARCHAR(100) NOT NULL,
+    size INTEGER NOT NULL,
+    data BYTEA NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,7 @@
+-- Индекс загруженных в CDN фото по SHA-256 исходных байтов: повторная загрузка того же файла возвращает готовый результат
+CREATE TABLE IF NOT EXISTS photo_upload_index (
+    sha256 CHAR(64) PRIMARY KEY,
+    url TEXT NOT NULL,
+    result JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,16 @@
+-- Незавершённые загрузки документов по частям: файл собирается в documents при finalize
+CREATE TABLE IF NOT EXISTS document_uploads (
+    id VARCHAR(32) PRIMARY KEY,
+    doc_type VARCHAR(50) NOT NULL,
+    mime_type VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS document_upload_chunks (
+    upload_id VARCHAR(32) NOT NULL REFERENCES document_uploads(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    data BYTEA NOT NULL,
+    PRIMARY KEY (upload_id, seq)
+);
+
+CREATE INDEX IF NOT EXISTS idx_document_uploads_created_at ON document_uploads(created_at);
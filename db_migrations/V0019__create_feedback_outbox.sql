@@ -0,0 +1,15 @@
+-- Transactional outbox: a row per new feedback message, written in the same transaction as the message
+-- and drained by the feedback-notify worker
+CREATE TABLE IF NOT EXISTS t_p40618121_yenisei_sport_hall_1.feedback_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    message_id INTEGER NOT NULL REFERENCES t_p40618121_yenisei_sport_hall_1.feedback_messages(id) ON DELETE CASCADE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    available_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    delivered_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_feedback_outbox_pending
+    ON t_p40618121_yenisei_sport_hall_1.feedback_outbox(available_at, id)
+    WHERE delivered_at IS NULL;
@@ -0,0 +1,13 @@
+-- Полнотекстовый поиск по обращениям: русская морфология для имени и текста, 'simple' - для email
+-- и точных совпадений слов, которых нет в словаре (фамилии, латиница, номера)
+ALTER TABLE t_p40618121_yenisei_sport_hall_1.feedback_messages
+ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('russian', coalesce(name, '')), 'A') ||
+    -- email целиком и по частям, чтобы находились и 'ivan@mail.ru', и просто 'ivan'
+    setweight(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(email, '') || ' ' || translate(coalesce(email, ''), '@.', '  ')), 'A') ||
+    setweight(to_tsvector('russian', coalesce(message, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(message, '')), 'C')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_feedback_search_vector
+ON t_p40618121_yenisei_sport_hall_1.feedback_messages USING GIN (search_vector);
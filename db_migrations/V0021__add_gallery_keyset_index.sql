@@ -0,0 +1,3 @@
+-- Индекс под постраничную выдачу галереи: ORDER BY created_at DESC, id DESC с курсором (created_at, id)
+-- Старый idx_gallery_photos_created_at не трогаем: после V0010 он принадлежит gallery_photos_old, а не этой таблице
+CREATE INDEX IF NOT EXISTS idx_gallery_photos_created_id ON gallery_photos(created_at DESC, id DESC);
@@ -0,0 +1,45 @@
+-- Готовый JSON публичного контента (контакты, виды спорта, партнёры) одной строкой: GET отдаёт body без сборки и сериализации.
+-- version растёт при каждом изменении исходных таблиц и служит ETag; body = NULL означает, что снимок нужно пересобрать
+CREATE TABLE IF NOT EXISTS t_p40618121_yenisei_sport_hall_1.content_snapshot (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 1,
+    body TEXT,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO t_p40618121_yenisei_sport_hall_1.content_snapshot (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+-- Запись в исходные таблицы (из API, миграцией или вручную) сбрасывает снимок в той же транзакции,
+-- поэтому устаревший body не переживает коммит изменений
+CREATE OR REPLACE FUNCTION t_p40618121_yenisei_sport_hall_1.content_snapshot_invalidate()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE t_p40618121_yenisei_sport_hall_1.content_snapshot
+    SET version = version + 1,
+        body = NULL,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = 1;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_contacts_content_snapshot
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON contacts
+FOR EACH STATEMENT EXECUTE FUNCTION t_p40618121_yenisei_sport_hall_1.content_snapshot_invalidate();
+
+CREATE TRIGGER trg_sports_content_snapshot
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON sports
+FOR EACH STATEMENT EXECUTE FUNCTION t_p40618121_yenisei_sport_hall_1.content_snapshot_invalidate();
+
+CREATE TRIGGER trg_sport_rules_content_snapshot
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON sport_rules
+FOR EACH STATEMENT EXECUTE FUNCTION t_p40618121_yenisei_sport_hall_1.content_snapshot_invalidate();
+
+CREATE TRIGGER trg_sport_safety_content_snapshot
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON sport_safety
+FOR EACH STATEMENT EXECUTE FUNCTION t_p40618121_yenisei_sport_hall_1.content_snapshot_invalidate();
+
+CREATE TRIGGER trg_partners_content_snapshot
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON partners
+FOR EACH STATEMENT EXECUTE FUNCTION t_p40618121_yenisei_sport_hall_1.content_snapshot_invalidate();
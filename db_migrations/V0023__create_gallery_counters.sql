@@ -0,0 +1,39 @@
+-- Число фото галереи, поддерживаемое триггером, чтобы страница галереи не считала COUNT(*) по всей таблице
+CREATE TABLE IF NOT EXISTS t_p40618121_yenisei_sport_hall_1.gallery_counters (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO t_p40618121_yenisei_sport_hall_1.gallery_counters (id, total_count)
+SELECT 1, COUNT(*)
+FROM t_p40618121_yenisei_sport_hall_1.gallery_photos
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION t_p40618121_yenisei_sport_hall_1.gallery_counters_sync()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        UPDATE t_p40618121_yenisei_sport_hall_1.gallery_counters
+        SET total_count = 0, updated_at = CURRENT_TIMESTAMP
+        WHERE id = 1;
+    ELSE
+        UPDATE t_p40618121_yenisei_sport_hall_1.gallery_counters
+        SET total_count = total_count + CASE TG_OP WHEN 'INSERT' THEN 1 ELSE -1 END,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_gallery_counters_sync
+AFTER INSERT OR DELETE
+ON t_p40618121_yenisei_sport_hall_1.gallery_photos
+FOR EACH ROW EXECUTE FUNCTION t_p40618121_yenisei_sport_hall_1.gallery_counters_sync();
+
+CREATE TRIGGER trg_gallery_counters_truncate
+AFTER TRUNCATE
+ON t_p40618121_yenisei_sport_hall_1.gallery_photos
+FOR EACH STATEMENT EXECUTE FUNCTION t_p40618121_yenisei_sport_hall_1.gallery_counters_sync();
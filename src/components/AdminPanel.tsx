@@ -35,6 +35,17 @@ interface AdminPanelProps {
   onPasswordChange: (oldPassword: string, newPassword: string) => Promise<boolean>;
 }
 
+const DOCUMENTS_URL = 'https://functions.poehali.dev/f86464fd-afbd-480b-a209-1e5d436e180f';
+const DOCUMENT_CHUNK_BYTES = 1024 * 1024;
+
+const readChunkAsBase64 = (chunk: Blob) =>
+  new Promise<string>((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onload = () => resolve((reader.result as string).split(',')[1] ?? '');
+    reader.onerror = () => reject(reader.error);
+    reader.readAsDataURL(chunk);
+  });
+
 const AdminPanel = ({ isOpen, onClose, contacts, sports, onUpdateContacts, onUpdateSports, onPasswordChange }: AdminPanelProps) => {
   const [editedContacts, setEditedContacts] = useState(contacts);
   const [editedSports, setEditedSports] = useState(sports);
@@ -59,23 +70,38 @@ const AdminPanel = ({ isOpen, onClose, contacts, sports, onUpdateContacts, onUpd
 
   const loadFeedbackStats = async () => {
     try {
-      const response = await fetch('https://functions.poehali.dev/56afe0b0-2d50-4a7c-9498-8cfc3b2df974?archived=false');
-      const activeData = await response.json();
-      
-      const archivedResponse = await fetch('https://functions.poehali.dev/56afe0b0-2d50-4a7c-9498-8cfc3b2df974?archived=true');
-      const archivedData = await archivedResponse.json();
+      const response = await fetch('https://functions.poehali.dev/56afe0b0-2d50-4a7c-9498-8cfc3b2df974?mode=dashboard');
+      const data = await response.json();
       
       setFeedbackStats({
-        feedback: [...activeData.feedback, ...archivedData.feedback],
-        total_count: activeData.total_count,
-        unread_count: activeData.unread_count,
-        archived_count: activeData.archived_count
+        feedback: [...data.active, ...data.archived],
+        next_cursor_active: data.next_cursor_active,
+        next_cursor_archived: data.next_cursor_archived,
+        total_count: data.total_count,
+        unread_count: data.unread_count,
+        archived_count: data.archived_count
       });
     } catch (error) {
       console.error('Failed to load feedback stats:', error);
     }
   };
 
+  const loadMoreFeedback = async (archived: boolean) => {
+    const cursor = archived ? feedbackStats?.next_cursor_archived : feedbackStats?.next_cursor_active;
+    if (!cursor) return;
+    try {
+      const response = await fetch(`https://functions.poehali.dev/56afe0b0-2d50-4a7c-9498-8cfc3b2df974?archived=${archived}&cursor=${encodeURIComponent(cursor)}`);
+      const data = await response.json();
+      setFeedbackStats((prev: any) => ({
+        ...prev,
+        feedback: [...prev.feedback, ...data.feedback],
+        [archived ? 'next_cursor_archived' : 'next_cursor_active']: data.next_cursor
+      }));
+    } catch (error) {
+      console.error('Failed to load more feedback:', error);
+    }
+  };
+
   const handleSaveContacts = async () => {
     console.log('=== handleSaveContacts START ===');
     
@@ -217,55 +243,45 @@ const AdminPanel = ({ isOpen, onClose, contacts, sports, onUpdateContacts, onUpd
     setUploadStatus(prev => ({ ...prev, [docType]: 'uploading' }));
 
     try {
-      const reader = new FileReader();
-      
-      reader.onload = async () => {
-        try {
-          const base64Data = reader.result as string;
-          const base64Content = base64Data.split(',')[1];
-
-          const response = await fetch('https://functions.poehali.dev/f86464fd-afbd-480b-a209-1e5d436e180f', {
-            method: 'POST',
-            headers: {
-              'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-              docType: docType,
-              fileData: base64Content
-            })
-          });
-
-          if (response.ok) {
-            setUploadStatus(prev => ({ ...prev, [docType]: 'success' }));
-            toast({
-              title: 'Документ загружен',
-              description: `Файл ${file.name} успешно загружен`,
-            });
-            setTimeout(() => {
-              setUploadStatus(prev => ({ ...prev, [docType]: 'idle' }));
-            }, 3000);
-          } else {
-            throw new Error('Upload failed');
-          }
-        } catch (error) {
-          setUploadStatus(prev => ({ ...prev, [docType]: 'error' }));
-          toast({
-            title: 'Ошибка',
-            description: 'Не удалось загрузить документ',
-            variant: 'destructive'
-          });
-          setTimeout(() => {
-            setUploadStatus(prev => ({ ...prev, [docType]: 'idle' }));
-          }, 3000);
+      const postStep = async (payload: Record<string, unknown>) => {
+        const response = await fetch(DOCUMENTS_URL, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json'
+          },
+          body: JSON.stringify(payload)
+        });
+        if (!response.ok) {
+          throw new Error('Upload failed');
         }
+        return response.json();
       };
 
-      reader.readAsDataURL(file);
+      // Файл уходит частями: ни браузеру, ни функции не нужно держать весь PDF в base64
+      const { uploadId, maxChunkBytes } = await postStep({ action: 'init', docType });
+      const chunkSize = Math.min(DOCUMENT_CHUNK_BYTES, maxChunkBytes || DOCUMENT_CHUNK_BYTES);
+      const chunkCount = Math.max(1, Math.ceil(file.size / chunkSize));
+
+      for (let index = 0; index < chunkCount; index++) {
+        const data = await readChunkAsBase64(file.slice(index * chunkSize, (index + 1) * chunkSize));
+        await postStep({ action: 'chunk', uploadId, index, data });
+      }
+
+      await postStep({ action: 'finalize', uploadId, chunks: chunkCount });
+
+      setUploadStatus(prev => ({ ...prev, [docType]: 'success' }));
+      toast({
+        title: 'Документ загружен',
+        description: `Файл ${file.name} успешно загружен`,
+      });
+      setTimeout(() => {
+        setUploadStatus(prev => ({ ...prev, [docType]: 'idle' }));
+      }, 3000);
     } catch (error) {
       setUploadStatus(prev => ({ ...prev, [docType]: 'error' }));
       toast({
         title: 'Ошибка',
-        description: 'Не удалось прочитать файл',
+        description: 'Не удалось загрузить документ',
         variant: 'destructive'
       });
       setTimeout(() => {
@@ -361,6 +377,7 @@ const AdminPanel = ({ isOpen, onClose, contacts, sports, onUpdateContacts, onUpd
             <FeedbackTab
               feedbackStats={feedbackStats}
               onRefresh={loadFeedbackStats}
+              onLoadMore={loadMoreFeedback}
             />
           </TabsContent>
 
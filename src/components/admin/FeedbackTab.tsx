@@ -9,9 +9,10 @@ import { useToast } from '@/hooks/use-toast';
 interface FeedbackTabProps {
   feedbackStats: any;
   onRefresh: () => void;
+  onLoadMore: (archived: boolean) => void;
 }
 
-export const FeedbackTab = ({ feedbackStats, onRefresh }: FeedbackTabProps) => {
+export const FeedbackTab = ({ feedbackStats, onRefresh, onLoadMore }: FeedbackTabProps) => {
   const [expandedId, setExpandedId] = useState<number | null>(null);
   const [activeTab, setActiveTab] = useState<'active' | 'archived'>('active');
   const { toast } = useToast();
@@ -38,6 +39,29 @@ export const FeedbackTab = ({ feedbackStats, onRefresh }: FeedbackTabProps) => {
     }
   };
 
+  const markAllAsRead = async () => {
+    try {
+      const response = await fetch('https://functions.poehali.dev/56afe0b0-2d50-4a7c-9498-8cfc3b2df974', {
+        method: 'PUT',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ action: 'mark_read', filter: { unread: true, archived: false } })
+      });
+      if (response.ok) {
+        const data = await response.json();
+        toast({
+          title: `Отмечено прочитанными: ${data.affected}`,
+        });
+        onRefresh();
+      }
+    } catch (error) {
+      toast({
+        title: 'Ошибка',
+        description: 'Не удалось обновить статус',
+        variant: 'destructive'
+      });
+    }
+  };
+
   const archiveFeedback = async (id: number) => {
     try {
       const response = await fetch(`https://functions.poehali.dev/56afe0b0-2d50-4a7c-9498-8cfc3b2df974?id=${id}`, {
@@ -252,10 +276,18 @@ export const FeedbackTab = ({ feedbackStats, onRefresh }: FeedbackTabProps) => {
               Архив ({archivedFeedback.length})
             </TabsTrigger>
           </TabsList>
-          <Button variant="outline" size="sm" onClick={onRefresh}>
-            <Icon name="RefreshCw" size={16} className="mr-2" />
-            Обновить
-          </Button>
+          <div className="flex gap-2">
+            {activeTab === 'active' && feedbackStats.unread_count > 0 && (
+              <Button variant="outline" size="sm" onClick={markAllAsRead}>
+                <Icon name="CheckCheck" size={16} className="mr-2" />
+                Прочитать все
+              </Button>
+            )}
+            <Button variant="outline" size="sm" onClick={onRefresh}>
+              <Icon name="RefreshCw" size={16} className="mr-2" />
+              Обновить
+            </Button>
+          </div>
         </div>
 
         <TabsContent value="active" className="space-y-4">
@@ -269,6 +301,11 @@ export const FeedbackTab = ({ feedbackStats, onRefresh }: FeedbackTabProps) => {
           ) : (
             activeFeedback.map((item: any) => renderFeedbackCard(item, false))
           )}
+          {feedbackStats.next_cursor_active && (
+            <Button variant="outline" className="w-full" onClick={() => onLoadMore(false)}>
+              Показать ещё
+            </Button>
+          )}
         </TabsContent>
 
         <TabsContent value="archived" className="space-y-4">
@@ -282,6 +319,11 @@ export const FeedbackTab = ({ feedbackStats, onRefresh }: FeedbackTabProps) => {
           ) : (
             archivedFeedback.map((item: any) => renderFeedbackCard(item, true))
           )}
+          {feedbackStats.next_cursor_archived && (
+            <Button variant="outline" className="w-full" onClick={() => onLoadMore(true)}>
+              Показать ещё
+            </Button>
+          )}
         </TabsContent>
       </Tabs>
     </div>
@@ -1,15 +1,55 @@
+export interface GalleryPhotoSource {
+  format: 'webp' | 'jpeg';
+  width: number;
+  url: string;
+}
+
 export interface GalleryPhoto {
   id: string;
   url: string;
   title: string;
   description?: string;
+  width?: number | null;
+  height?: number | null;
+  placeholder?: string | null;
+  sources?: GalleryPhotoSource[];
+  variants?: (GalleryPhotoSource & { height?: number })[];
+}
+
+export interface GalleryPhotoSummary {
+  id: string;
+  title: string;
+  thumb: string;
+  width?: number | null;
+  height?: number | null;
 }
 
+export interface GalleryPage {
+  photos: GalleryPhotoSummary[];
+  total: number;
+  next_cursor: string | null;
+}
+
+export const buildSrcSet = (photo: GalleryPhoto, format: GalleryPhotoSource['format']): string =>
+  (photo.sources || [])
+    .filter((source) => source.format === format)
+    .map((source) => `${source.url} ${source.width}w`)
+    .join(', ');
+
 const API_URL = 'https://functions.poehali.dev/21d3a217-68ef-4999-967c-a520ffcd414b';
 
 export const galleryApi = {
-  async getPhotos(): Promise<GalleryPhoto[]> {
-    const response = await fetch(`${API_URL}?type=gallery`);
+  async getPhotos(cursor?: string | null, limit?: number): Promise<GalleryPage> {
+    const params = new URLSearchParams({ type: 'gallery' });
+    if (cursor) params.set('cursor', cursor);
+    if (limit) params.set('limit', String(limit));
+    const response = await fetch(`${API_URL}?${params.toString()}`);
+    if (!response.ok) throw new Error('Ошибка загрузки фото');
+    return await response.json();
+  },
+
+  async getPhoto(id: string): Promise<GalleryPhoto> {
+    const response = await fetch(`${API_URL}?type=gallery&id=${encodeURIComponent(id)}`);
     if (!response.ok) throw new Error('Ошибка загрузки фото');
     return await response.json();
   },
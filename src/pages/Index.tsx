@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useToast } from '@/hooks/use-toast';
 import AdminPanel from '@/components/AdminPanel';
 import Header from '@/components/sections/Header';
@@ -18,6 +18,7 @@ const Index = () => {
   const [captcha, setCaptcha] = useState({ num1: 0, num2: 0, answer: 0 });
   const [captchaInput, setCaptchaInput] = useState('');
   const [unreadCount, setUnreadCount] = useState(0);
+  const countersVersionRef = useRef<number | null>(null);
   const { toast } = useToast();
 
   const [contacts, setContacts] = useState({
@@ -85,9 +86,13 @@ const Index = () => {
   const loadUnreadCount = async () => {
     if (!isAdmin) return;
     try {
-      const response = await fetch('https://functions.poehali.dev/56afe0b0-2d50-4a7c-9498-8cfc3b2df974?archived=false');
+      const since = countersVersionRef.current !== null ? `&since=${countersVersionRef.current}` : '';
+      const response = await fetch(`https://functions.poehali.dev/56afe0b0-2d50-4a7c-9498-8cfc3b2df974?mode=counters${since}`);
       const data = await response.json();
-      setUnreadCount(data.unread_count || 0);
+      countersVersionRef.current = data.version ?? null;
+      if (data.changed !== false) {
+        setUnreadCount(data.unread_count || 0);
+      }
     } catch (error) {
       console.error('Failed to load unread count:', error);
     }
@@ -302,6 +307,7 @@ const Index = () => {
     localStorage.removeItem('adminSession');
     setIsAdmin(false);
     setUnreadCount(0);
+    countersVersionRef.current = null;
     toast({
       title: 'Выход выполнен',
       description: 'До скорой встречи!',